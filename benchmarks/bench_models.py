@@ -0,0 +1,74 @@
+""" Compares the pydantic and lite output modes of the managers
+
+Builds the results from parser output that was computed once beforehand, so
+only the model construction is measured: CPU time per result and peak of
+allocated memory (tracemalloc).
+
+    python benchmarks/bench_models.py [--devices 250] [--rounds 200]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from stub_server import load_fixture
+
+from cudy_router import cudy_parser
+from cudy_router.models.device import DevicesInfo
+from cudy_router.models.lite import build_model
+from cudy_router.models.sms import SMS
+
+
+def measure(build, rounds: int) -> tuple[float, int]:
+    """Mean seconds per call and allocation peak of one call"""
+
+    build()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        build()
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    result = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, choices=(5, 50, 250), default=250)
+    parser.add_argument("--sms", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    devices_info = cudy_parser.get_devices_info(load_fixture(f"devlist_{args.devices}.html"), "*")
+    sms_list = [
+        {
+            "index": i,
+            "phone_number": f"+3361234{i:04d}",
+            "text": f"Hello message {i}",
+            "timestamp": None,
+            "box": "inbox",
+            "cfg": f"cfg{i:04x}",
+        }
+        for i in range(args.sms)
+    ]
+    cases = {
+        f"DevicesInfo ({args.devices} devices)": lambda lite: build_model(DevicesInfo, devices_info, lite),
+        f"SMS list ({args.sms} messages)": lambda lite: [build_model(SMS, sms, lite) for sms in sms_list],
+    }
+
+    print(f"{'case':<32} {'mode':<9} {'time':>10} {'peak':>10}")
+    for name, case in cases.items():
+        results = {}
+        for mode, lite in (("pydantic", False), ("lite", True)):
+            elapsed, peak = results[mode] = measure(lambda: case(lite), args.rounds)
+            print(f"{name:<32} {mode:<9} {elapsed * 1e3:>8.3f}ms {peak / 1024:>8.1f}KB")
+        (base_time, base_peak), (lite_time, lite_peak) = results.values()
+        print(f"{'':<32} {'speedup':<9} {base_time / lite_time:>9.1f}x {base_peak / lite_peak:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
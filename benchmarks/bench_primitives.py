@@ -0,0 +1,152 @@
+""" Compares the value parsers of cudy_router.primitives with the previous ones
+
+The previous implementations are kept below for reference. Every case
+parses the values of a 1000 message SMS list (or as many durations, speeds
+and bands), and `get_sms_list` is timed on the whole page with both
+timestamp parsers.
+
+    python benchmarks/bench_primitives.py [--sms 1000] [--rounds 20]
+"""
+
+import argparse
+import re
+import time
+from datetime import datetime
+from unittest import mock
+
+from dateutil.parser import parse
+from dateutil.relativedelta import relativedelta
+
+from cudy_router import cudy_parser, primitives
+
+
+def legacy_band(raw_band_info: str):
+    if raw_band_info:
+        match = re.compile(
+            r".*BAND\s*(?P<band>\d+)\s*/\s*(?P<bandwidth>\d+)\s*MHz.*"
+        ).match(raw_band_info)
+        if match:
+            return f"B{match.group('band')}"
+    return None
+
+
+def legacy_seconds_duration(raw_duration: str) -> int:
+    if not raw_duration:
+        return None
+    duration_parts = raw_duration.lower().split()
+    duration = relativedelta()
+    for i, part in enumerate(duration_parts):
+        if part.count(":") == 2:
+            hours, minutes, seconds = part.split(":")
+            duration += relativedelta(hours=int(hours), minutes=int(minutes), seconds=int(seconds))
+        elif i == 0:
+            continue
+        elif part.startswith("year"):
+            duration += relativedelta(years=int(duration_parts[i - 1]))
+        elif part.startswith("month"):
+            duration += relativedelta(months=int(duration_parts[i - 1]))
+        elif part.startswith("week"):
+            duration += relativedelta(weeks=int(duration_parts[i - 1]))
+        elif part.startswith("day"):
+            duration += relativedelta(days=int(duration_parts[i - 1]))
+    now = datetime.now()
+    return int((now - (now - duration)).total_seconds())
+
+
+def legacy_speed(input_string: str) -> float:
+    if not input_string:
+        return None
+    unit = input_string.lower()
+    value = input_string.split(" ", 1)[0]
+    if unit.endswith(" kbps"):
+        return round(float(value) / 1024, 2)
+    if unit.endswith(" mbps"):
+        return float(value)
+    if unit.endswith(" gbps"):
+        return float(value) * 1024
+    if unit.endswith(" bps"):
+        return round(float(value) / 1024 / 1024, 2)
+    return 0
+
+
+def sms_list_page(count: int) -> str:
+    """SMS inbox page listing `count` messages, as rendered by the routers"""
+
+    rows = []
+    for i in range(count):
+        cells = (
+            str(i + 1),
+            f"+3361234{i:04d}",
+            f"Your data balance is {i * 13} MB.\nReply STOP to unsubscribe",
+            f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} {i % 24:02d}:{i % 60:02d}:05",
+        )
+        rows.append(
+            "<tr>"
+            + "".join(f'<td><p class="hidden-xs">{cell}</p><p class="visible-xs">{cell}</p></td>' for cell in cells)
+            + "<td><button onclick=\"cbi_show_modal('/cgi-bin/luci/admin/network/gcom/sms/readsms', "
+            + f"'/cgi-bin/luci/admin/network/gcom/sms/readsms?cfg=cfg{i:04x}&amp;smsbox=rec')\">Read</button></td>"
+            + "</tr>"
+        )
+    return f'<html><body><table class="table">{"".join(rows)}</table></body></html>'
+
+
+def measure(call, rounds: int) -> float:
+    """Mean seconds per call"""
+
+    call()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        call()
+    return (time.perf_counter() - start) / rounds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sms", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    page = sms_list_page(args.sms)
+    timestamps = [values[2] for values in cudy_parser._parse_tables(page).values()]
+    durations = [f"{i % 9} days {i % 24:02d}:{i % 60:02d}:{i % 60:02d}" for i in range(args.sms)]
+    speeds = [f"{i * 1.7:.2f} {('Kbps', 'Mbps', 'bps', 'Gbps')[i % 4]}" for i in range(args.sms)]
+    bands = [f"BAND {i % 40} / {(5, 10, 20)[i % 3]} MHz" for i in range(args.sms)]
+    document = cudy_parser.parse_document(page)
+
+    cases = {
+        f"timestamps ({args.sms})": (
+            lambda: [parse(value) for value in timestamps],
+            lambda: [primitives.parse_timestamp(value) for value in timestamps],
+        ),
+        f"durations ({args.sms})": (
+            lambda: [legacy_seconds_duration(value) for value in durations],
+            lambda: [primitives.seconds_duration(value) for value in durations],
+        ),
+        f"speeds ({args.sms})": (
+            lambda: [legacy_speed(value) for value in speeds],
+            lambda: [primitives.speed(value) for value in speeds],
+        ),
+        f"bands ({args.sms})": (
+            lambda: [legacy_band(value) for value in bands],
+            lambda: [primitives.band(value) for value in bands],
+        ),
+    }
+
+    def sms_list_with(parse_timestamp):
+        def run():
+            with mock.patch.object(cudy_parser, "parse_timestamp", parse_timestamp):
+                return cudy_parser.get_sms_list(document)
+        return run
+
+    cases[f"get_sms_list ({args.sms})"] = (sms_list_with(parse), sms_list_with(primitives.parse_timestamp))
+
+    print(f"{'case':<24} {'previous':>11} {'primitives':>11} {'speedup':>8}")
+    for name, (previous, current) in cases.items():
+        assert previous() == current(), name
+        before = measure(previous, args.rounds)
+        after = measure(current, args.rounds)
+        print(f"{name:<24} {before * 1e3:>9.3f}ms {after * 1e3:>9.3f}ms {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
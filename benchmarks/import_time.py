@@ -0,0 +1,105 @@
+""" Cold import time of the package, checked against a budget
+
+Each module is imported in fresh interpreters with `-X importtime` and the
+best of its cumulative import times (noise only ever adds time) is compared
+to the budget, set 15% above the time measured after deferring the heavy
+imports. The check
+also fails when a sync import loads a dependency that must stay deferred
+until first use (HTML engines, dateutil, tzlocal, asyncio, httpx).
+
+    python benchmarks/import_time.py [--runs 15]
+    python benchmarks/import_time.py --update   # rewrite the budget from this run
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+BUDGET = Path(__file__).parent / "import_budget.json"
+ROOT = Path(__file__).parent.parent
+
+MODULES = (
+    "cudy_router",
+    "cudy_router.router",
+    "cudy_router.devices_manager",
+    "cudy_router.modem_manager",
+    "cudy_router.sms_manager",
+)
+DEFERRED = ("bs4", "lxml", "dateutil", "tzlocal", "asyncio", "httpx")
+
+# Headroom given by --update over the measured time, relative and in ms
+MARGIN = 1.15
+SLACK = 2
+
+_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_once(module: str) -> Tuple[float, Set[str]]:
+    """Cumulative import time of `module` in ms and every module it loaded"""
+
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stderr
+    cumulative, loaded = 0.0, set()
+    for match in _LINE.finditer(output):
+        loaded.add(match.group(3))
+        # Top level entries: the package itself, then the module
+        if match.group(2) == " " and match.group(3).split(".")[0] == module.split(".")[0]:
+            cumulative += int(match.group(1)) / 1e3
+    return cumulative, loaded
+
+
+def measure(module: str, runs: int) -> Tuple[float, List[str]]:
+    """Best import time in ms and the deferred dependencies it loaded"""
+
+    times = []
+    loaded: Set[str] = set()
+    for _ in range(runs):
+        duration, loaded = import_once(module)
+        times.append(duration)
+    leaked = sorted({name.split(".")[0] for name in loaded} & set(DEFERRED))
+    return min(times), leaked
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15, help="fresh interpreters per module")
+    parser.add_argument("--update", action="store_true", help="rewrite the budget from this run")
+    args = parser.parse_args()
+
+    budget: Dict[str, float] = {}
+    if BUDGET.exists() and not args.update:
+        budget = json.loads(BUDGET.read_text(encoding="utf-8"))
+
+    failures = []
+    results: Dict[str, float] = {}
+    print(f"{'module':<30} {'best':>10} {'budget':>10}")
+    for module in MODULES:
+        best, leaked = measure(module, args.runs)
+        results[module] = best
+        limit = budget.get(module)
+        flag = ""
+        if limit is not None and best > limit:
+            failures.append(module)
+            flag = "  OVER BUDGET"
+        if leaked:
+            failures.append(module)
+            flag += f"  loads {', '.join(leaked)}"
+        limit_text = f"{limit:>8.1f}ms" if limit is not None else f"{'-':>10}"
+        print(f"{module:<30} {best:>8.1f}ms {limit_text}{flag}")
+
+    if args.update:
+        BUDGET.write_text(
+            json.dumps({module: round(best * MARGIN + SLACK) for module, best in results.items()}, indent=2) + "\n",
+            encoding="utf-8",
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
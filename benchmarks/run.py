@@ -0,0 +1,243 @@
+""" Benchmarks of the parser entry points and of the managers end to end
+
+Parser cases time each `cudy_parser` entry point on the recorded fixtures.
+Manager cases go through `CudyRouter` against the stub server, with the
+response cache and result memo disabled so every call does the full
+HTTP + parse + validation work.
+
+Each case reports throughput, latency percentiles and the peak of memory
+allocated by one call (tracemalloc). Results can be saved as JSON and a
+later run compared against them, failing when a case got slower.
+
+    python benchmarks/run.py [-k devlist] [--backend lxml] [--json out.json]
+    python benchmarks/run.py --compare out.json [--threshold 0.2]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from stub_server import DEVLIST_SIZES, StubServer, load_fixture
+
+from cudy_router import CudyRouter, cudy_parser, html_backend
+from cudy_router.devices_manager import DevicesManager
+from cudy_router.modem_manager import ModemManager
+from cudy_router.primitives import percentile
+from cudy_router.sms_manager import SMSManager
+
+PERCENTILES = (50, 90, 99)
+
+Case = Callable[[], Callable[[], Any]]
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str) -> Callable[[Case], Case]:
+    """Registers a case: a setup function returning the callable to time"""
+
+    def register(setup: Case) -> Case:
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+def _parser_case(name: str, function: Callable[[str], Any], *fixtures: str) -> None:
+    def setup() -> Callable[[], Any]:
+        page = "".join(load_fixture(fixture) for fixture in fixtures)
+        return lambda: function(page)
+
+    case(name)(setup)
+
+
+_parser_case("parser.get_login_info", cudy_parser.get_login_info, "login.html")
+_parser_case(
+    "parser.get_modem_info", cudy_parser.get_modem_info, "status.html", "status_detail.html"
+)
+_parser_case("parser.get_sim_value", cudy_parser.get_sim_value, "status.html")
+_parser_case("parser.get_sms_summary", cudy_parser.get_sms_summary, "sms_status.html")
+_parser_case("parser.get_sms_list[50]", cudy_parser.get_sms_list, "smslist_inbox.html")
+_parser_case("parser.read_sms", cudy_parser.read_sms, "readsms.html")
+for _size in DEVLIST_SIZES:
+    _parser_case(
+        f"parser.get_all_devices[{_size}]", cudy_parser.get_all_devices, f"devlist_{_size}.html"
+    )
+    _parser_case(
+        f"parser.get_devices_info[{_size}]",
+        lambda page: cudy_parser.get_devices_info(page, "*"),
+        f"devlist_{_size}.html",
+    )
+_parser_case(
+    "parser.parse_document[250]", cudy_parser.parse_document, "devlist_250.html"
+)
+# The two ways get_all_devices may take through raw HTML, it should match the
+# faster one for the selected backend
+_parser_case(
+    "parser.iter_devices[250]", lambda page: list(cudy_parser.iter_devices(page)), "devlist_250.html"
+)
+_parser_case(
+    "parser.devices_tree_walk[250]",
+    lambda page: cudy_parser.get_all_devices(cudy_parser.parse_document(page)),
+    "devlist_250.html",
+)
+
+_servers: Dict[int, StubServer] = {}
+
+
+def _router(devices: int = 250) -> CudyRouter:
+    """An authenticated router on the stub serving `devices` clients, without cache"""
+
+    server = _servers.get(devices)
+    if server is None:
+        server = _servers[devices] = StubServer(devices).start()
+    router = CudyRouter("127.0.0.1", "admin", "admin", server.port, cache_policies={})
+    router.authenticate()
+    return router
+
+
+@case("manager.authenticate")
+def _authenticate() -> Callable[[], Any]:
+    return _router().authenticate
+
+
+@case("manager.get_modem_info")
+def _modem_info() -> Callable[[], Any]:
+    return ModemManager(_router(), memo_size=0).get_modem_info
+
+
+def _devices_case(size: int) -> None:
+    @case(f"manager.get_devices[{size}]")
+    def setup() -> Callable[[], Any]:
+        return DevicesManager(_router(size), memo_size=0).get_devices
+
+
+for _size in DEVLIST_SIZES:
+    _devices_case(_size)
+
+
+@case("manager.get_sms_summary")
+def _sms_summary() -> Callable[[], Any]:
+    return SMSManager(_router(), memo_size=0).get_sms_summary
+
+
+@case("manager.get_sms_list[50]")
+def _sms_list() -> Callable[[], Any]:
+    return SMSManager(_router(), memo_size=0).get_sms_list
+
+
+@case("manager.read_sms")
+def _read_sms() -> Callable[[], Any]:
+    return lambda manager=SMSManager(_router(), memo_size=0): manager.read_sms("cfg0000", "inbox")
+
+
+@case("manager.read_sms_many[50]")
+def _read_sms_many() -> Callable[[], Any]:
+    manager = SMSManager(_router(), memo_size=0)
+    messages = manager.get_sms_list()
+    return lambda: manager.read_sms_many(messages)
+
+
+def measure(call: Callable[[], Any], min_time: float, min_rounds: int) -> Dict[str, float]:
+    """Times `call` until both `min_time` and `min_rounds` are reached"""
+
+    for _ in range(3):
+        call()
+
+    latencies = []
+    gc.collect()
+    started = time.perf_counter()
+    while len(latencies) < min_rounds or time.perf_counter() - started < min_time:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    result = {
+        "rounds": len(latencies),
+        "ops_per_s": len(latencies) / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) * 1e3,
+    }
+    for percent in PERCENTILES:
+        result[f"p{percent}_ms"] = percentile(latencies, percent) * 1e3
+    result["peak_kb"] = peak / 1024
+    return result
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Cases whose median latency regressed by more than `threshold`"""
+
+    regressions = []
+    print(f"\n{'case':<34} {'baseline p50':>13} {'p50':>10} {'change':>8}")
+    for name, result in results.items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        change = result["p50_ms"] / reference["p50_ms"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<34} {reference['p50_ms']:>11.3f}ms {result['p50_ms']:>8.3f}ms {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="keyword", help="only run cases containing this string")
+    parser.add_argument("--backend", choices=list(html_backend.BACKENDS), help="HTML backend to use")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds spent per case")
+    parser.add_argument("--min-rounds", type=int, default=20, help="calls timed per case")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--compare", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated p50 slowdown")
+    args = parser.parse_args()
+
+    html_backend.set_backend(args.backend)
+    names = [name for name in CASES if not args.keyword or args.keyword in name]
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<34} {'ops/s':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'peak':>10}")
+    try:
+        for name in names:
+            result = results[name] = measure(CASES[name](), args.min_time, args.min_rounds)
+            print(
+                f"{name:<34} {result['ops_per_s']:>9.1f}"
+                + "".join(f" {result[f'p{percentile}_ms']:>7.3f}ms" for percentile in PERCENTILES)
+                + f" {result['peak_kb']:>8.1f}KB"
+            )
+    finally:
+        for server in _servers.values():
+            server.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump({
+                "meta": {
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": sys.version.split()[0],
+                    "platform": platform.platform(),
+                    "backend": html_backend.get_backend().name,
+                },
+                "results": results,
+            }, output, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            if compare(results, json.load(baseline), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
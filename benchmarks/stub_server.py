@@ -0,0 +1,145 @@
+""" Minimal LuCI stand-in serving the recorded fixtures
+
+Implements just enough of the router for the managers: the 403 login form,
+the `sysauth` cookie set by the login POST and the pages below. It runs in
+a separate process so that it neither competes for the GIL nor shows in
+the memory measurements of the benchmarked client.
+
+    python benchmarks/stub_server.py [--port 8080] [--devices 250]
+"""
+
+import argparse
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+ROOT = "/cgi-bin/luci"
+SESSION = "sysauth=5e55104c0ffee"
+
+ROUTES = {
+    "admin/network/gcom/status": "status.html",
+    "admin/network/gcom/status?detail=1": "status_detail.html",
+    "admin/network/gcom/sms/status": "sms_status.html",
+    "admin/network/gcom/sms/smslist?smsbox=rec": "smslist_inbox.html",
+    "admin/network/gcom/sms/smslist?smsbox=sto": "smslist_outbox.html",
+    "admin/network/gcom/sms/readsms": "readsms.html",
+}
+DEVLIST = "admin/network/devices/devlist?detail=1"
+DEVLIST_SIZES = (5, 50, 250)
+
+
+def load_fixture(name: str) -> str:
+    """Contents of a fixture page"""
+
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def _handler(devices: int) -> type:
+    pages = {path: load_fixture(name).encode() for path, name in ROUTES.items()}
+    pages[DEVLIST] = load_fixture(f"devlist_{devices}.html").encode()
+    login = load_fixture("login.html").encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately: avoid the delayed ACK stall
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def _send(self, status: int, body: bytes, headers: dict = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            path = self.path[len(ROOT) + 1:] if self.path.startswith(ROOT + "/") else None
+            if path is None or SESSION not in self.headers.get("Cookie", ""):
+                self._send(403, login)
+                return
+            page = pages.get(path)
+            if page is None and path.startswith("admin/network/gcom/sms/readsms?"):
+                page = pages["admin/network/gcom/sms/readsms"]
+            if page is None:
+                self._send(404, b"Not Found")
+            else:
+                self._send(200, page)
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path == ROOT:
+                self._send(302, b"", {"Set-Cookie": f"{SESSION}; path={ROOT}/; HttpOnly"})
+            elif SESSION in self.headers.get("Cookie", ""):
+                self._send(200, b"OK")
+            else:
+                self._send(403, login)
+
+    return Handler
+
+
+def _serve(devices: int, port: int, ready) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(devices))
+    server.daemon_threads = True
+    ready.send(server.server_address[1])
+    server.serve_forever()
+
+
+class StubServer:
+    """Stub router running in a child process, as a context manager"""
+
+    def __init__(self, devices: int = 250, port: int = 0) -> None:
+        """Initialize."""
+        if devices not in DEVLIST_SIZES:
+            raise ValueError(f"No devlist fixture for {devices} devices")
+        self.devices = devices
+        self.port = port
+        self._process = None
+
+    def start(self) -> "StubServer":
+        """Starts the server and waits for it to listen"""
+
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.devices, self.port, sender), daemon=True
+        )
+        self._process.start()
+        self.port = receiver.recv()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server"""
+
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--devices", type=int, choices=DEVLIST_SIZES, default=250)
+    args = parser.parse_args()
+
+    with StubServer(args.devices, args.port) as server:
+        print(f"Serving on http://127.0.0.1:{server.port}{ROOT}")
+        try:
+            server._process.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Library to access Cudy routers' information"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .router import CudyRouter
+
+__all__ = ["CudyRouter"]
+
+
+def __getattr__(name: str):
+    # `requests` is only imported once the router is needed, so that e.g.
+    # the emulator or the instrumentation can be imported on their own
+    if name == "CudyRouter":
+        from .router import CudyRouter  # pylint: disable=import-outside-toplevel
+
+        return CudyRouter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,316 @@
+"""Provides an asyncio backend for a Cudy router"""
+
+import time
+import math
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Callable, TypeVar
+import httpx
+
+from . import cudy_parser
+from .cache import DEFAULT_CACHE_SIZE, ResponseCache
+from .exceptions import (
+    AuthenticationError,
+    CircuitOpenError,
+    RouterConnectionError,
+    RouterHTTPError,
+    RouterTimeoutError,
+)
+from .instrumentation import get_hooks
+from .resilience import RequestPolicy
+from .router import (
+    DEFAULT_CACHE_POLICIES,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_SESSION_MARGIN,
+    DEFAULT_SESSION_TIMEOUT,
+)
+from .router_base import RouterBase
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class AsyncCudyRouter(RouterBase):
+    """Represents a router and provides coroutines for communication.
+
+    Same semantics as `CudyRouter` (salted sha256 login, re-authentication
+    on 403, request policy and typed errors) on top of a pooled `httpx.AsyncClient`, so a single event loop
+    can talk to many routers without a thread per router. The I/O free logic
+    of both comes from `RouterBase`.
+    """
+
+    def __init__(
+        self, host: str, username: str, password: str, port: int = 80,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        cache_policies: dict[str, timedelta] | None = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        session_timeout: timedelta | None = DEFAULT_SESSION_TIMEOUT,
+        session_margin: timedelta = DEFAULT_SESSION_MARGIN,
+        policy: RequestPolicy | None = None,
+    ) -> None:
+        """Initialize."""
+        self.host = host
+        self.port = port
+        self.url = f"http://{self.host}:{self.port}/cgi-bin/luci"
+        self.username = username
+        self.password = password
+        self.token = None
+        self.policy = policy or RequestPolicy()
+        self.breaker = self.policy.circuit_breaker()
+        connect_timeout, read_timeout = self.policy.timeout
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            follow_redirects=False,
+            limits=httpx.Limits(
+                max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize
+            ),
+        )
+        self.cache = ResponseCache(
+            DEFAULT_CACHE_POLICIES if cache_policies is None else cache_policies, cache_size
+        )
+        self.session_timeout = session_timeout
+        self.session_margin = session_margin
+        self._session_used: float | None = None
+        self._auth_lock = asyncio.Lock()
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def __aenter__(self) -> "AsyncCudyRouter":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Closes the pooled connections to the router."""
+
+        await self.client.aclose()
+
+    @property
+    def auth_cookie(self) -> str | None:
+        """Returns the current `sysauth` session cookie, if any."""
+
+        return self.client.cookies.get("sysauth")
+
+    async def _ensure_authenticated(self) -> bool:
+        """Logs in if there is no session yet or if it is about to expire."""
+
+        if not self._session_stale():
+            return True
+        if cookie := self.auth_cookie:
+            self._count("refreshes")
+        return await self._reauthenticate(cookie)
+
+    async def _reauthenticate(self, stale_cookie: str | None, login_page: str = None) -> bool:
+        """Replaces the `stale_cookie` session unless another caller already did"""
+
+        async with self._auth_lock:
+            if self.auth_cookie and self.auth_cookie != stale_cookie:
+                return True
+            return await self._login(login_page)
+
+    async def authenticate(self, login_page: str = None) -> bool:
+        """Test if we can authenticate with the host (see `CudyRouter.authenticate`)."""
+
+        try:
+            self.breaker.before_call(self._address)
+        except CircuitOpenError as err:
+            _LOGGER.debug("%s", err)
+            return False
+        try:
+            async with self._auth_lock:
+                success = await self._login(login_page)
+        except httpx.TransportError as err:
+            self.breaker.record_failure()
+            _LOGGER.debug("Login to %s failed: %s", self._address, err)
+            return False
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return success
+
+    async def _login(self, login_page: str = None) -> bool:
+        hooks = get_hooks()
+        if hooks is None:
+            return await self._authenticate(login_page)
+        start = time.perf_counter()
+        success = False
+        try:
+            success = await self._authenticate(login_page)
+            return success
+        finally:
+            hooks.authentication(self._address, success, time.perf_counter() - start)
+
+    async def _authenticate(self, login_page: str = None) -> bool:
+        # The 403 answer to an expired session carries a usable login form
+        if (data := self._login_info(login_page)) and await self._post_login(data):
+            return True
+
+        # Otherwise the login page must be requested anonymously
+        self.client.cookies.clear()
+        response = await self._request("GET", "")
+        if response.status_code == 403 and (data := cudy_parser.get_login_info(response.text)):
+            return await self._post_login(data)
+        return False
+
+    async def _post_login(self, data: dict[str, str]) -> bool:
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+        self.client.cookies.clear()
+        self.token = data.get('token')
+        response = await self._request(
+            "POST", "", headers=headers, content=self._login_form(data)
+        )
+        if response.status_code >= 400 or self.auth_cookie is None:
+            return False
+        self._session_used = time.monotonic()
+        return True
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends one request to the router, reporting it to the instrumentation hooks"""
+
+        full_url = f"{self.url}/{url}" if url else self.url
+        hooks = get_hooks()
+        if hooks is None:
+            return await self.client.request(method, full_url, **kwargs)
+        start = time.perf_counter()
+        status, size = None, 0
+        try:
+            response = await self.client.request(method, full_url, **kwargs)
+            status, size = response.status_code, len(response.content)
+            return response
+        finally:
+            hooks.request(self._address, method, url, status, size, time.perf_counter() - start)
+
+    async def parse(self, function: Callable[..., _T], *args) -> _T:
+        """Runs `function(*args)`, the parse of pages of this router, in a worker thread
+
+        A large page then does not hold up the requests to the other routers
+        served by the event loop, nor the timeouts of their polls.
+        """
+
+        return await asyncio.to_thread(function, *args)
+
+    async def get(self, url: str, use_cache: bool = True) -> str:
+        """Retrieves data from the given URL (see `CudyRouter.get`)."""
+
+        if not use_cache or not self.cache.ttl(url):
+            return await self._get(url)
+        if (cached := self.cache.get(url)) is not None:
+            self._count("cache_hits")
+            return cached
+        self._count("cache_misses")
+
+        if (inflight := self._inflight.get(url)) is not None:
+            # The waiters share the outcome of the request, its error included
+            body = await asyncio.shield(inflight)
+            if body is None:
+                # The request was cancelled, not answered
+                return await self.get(url)
+            self._count("coalesced")
+            return body
+
+        inflight = self._inflight[url] = asyncio.get_running_loop().create_future()
+        try:
+            body = await self._get(url)
+        except Exception as err:
+            del self._inflight[url]
+            inflight.set_exception(err)
+            # Retrieved here so that a failure nobody waited for is not logged
+            inflight.exception()
+            raise
+        except BaseException:
+            del self._inflight[url]
+            inflight.set_result(None)
+            raise
+        if body:
+            self.cache.put(url, body)
+        del self._inflight[url]
+        inflight.set_result(body)
+        return body
+
+    async def _get(self, url: str) -> str:
+        """Retrieves data from the router, bypassing the cache"""
+
+        return await self._send("GET", url)
+
+    async def post(self, url: str, body_multipart: dict = None) -> str:
+        """Retrieves data from the given URL using an authenticated session."""
+
+        if body_multipart is None:
+            body_multipart = {}
+
+        def prepare() -> dict:
+            # Whatever the outcome, the post may have changed the router state
+            self.cache.invalidate()
+            body_multipart["token"] = self.token
+            body_multipart["timeclock"] = int(math.floor(time.time()/1000))
+            # Same multipart layout as requests' `files=`: the field name doubles as file name
+            return {"files": {key: (key, str(value)) for key, value in body_multipart.items()}}
+
+        return await self._send("POST", url, prepare)
+
+    async def _send(self, method: str, url: str, prepare: Callable[[], dict] = dict) -> str:
+        """Sends an authenticated request following the policy (see `CudyRouter._send`)"""
+
+        self.breaker.before_call(self._address)
+        try:
+            text = await self._attempt(method, url, prepare)
+        except RouterConnectionError:
+            self.breaker.record_failure()
+            raise
+        except RouterHTTPError as err:
+            if err.status < 500:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        except AuthenticationError:
+            self.breaker.record_success()
+            raise
+        except BaseException:
+            # Cancelled, interrupted or a bug: nothing learned about the router
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return text
+
+    async def _attempt(self, method: str, url: str, prepare: Callable[[], dict]) -> str:
+        attempt = 0
+        reauthenticated = False
+        while True:
+            attempt += 1
+            try:
+                if not await self._ensure_authenticated():
+                    raise AuthenticationError(f"Authentication to {self._address} failed")
+                cookie = self.auth_cookie
+                # `prepare` builds the arguments anew for each attempt
+                response = await self._request(method, url, **prepare())
+                if response.status_code == 403:
+                    self._count("reauths")
+                    if reauthenticated or not await self._reauthenticate(cookie, response.text):
+                        raise AuthenticationError(f"Authentication to {self._address} failed")
+                    # A renewed session does not use up an attempt
+                    reauthenticated = True
+                    attempt -= 1
+                    continue
+            except httpx.TimeoutException as err:
+                error: Exception = RouterTimeoutError(f"{self._address} timed out: {err}")
+            except httpx.TransportError as err:
+                error = RouterConnectionError(f"{self._address} unreachable: {err}")
+            else:
+                if response.status_code < 400:
+                    self._session_used = time.monotonic()
+                    return response.text
+                error = RouterHTTPError(response.status_code, url)
+                if response.status_code < 500:
+                    raise error
+
+            if attempt >= self.policy.attempts:
+                _LOGGER.error("Error retrieving data from %s: %s", url, error)
+                raise error
+            _LOGGER.debug("Retrying %s after: %s", url, error)
+            self._count("retries")
+            await asyncio.sleep(self.policy.delay(attempt))
@@ -0,0 +1,134 @@
+"""Caching of router responses and of the results parsed from them"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Iterable, Optional
+
+DEFAULT_CACHE_SIZE = 64
+DEFAULT_MEMO_SIZE = 16
+
+
+def _under(url: str, prefix: str) -> bool:
+    """Whether `url` is the `prefix` path itself, a path below it or one of their queries"""
+
+    if not prefix or prefix[-1] in "/?":
+        return url.startswith(prefix)
+    return url.startswith(prefix) and (len(url) == len(prefix) or url[len(prefix)] in "/?")
+
+
+class ResponseCache:
+    """LRU cache of page bodies keyed by URL path, with a TTL per endpoint
+
+    `policies` maps an endpoint path (query string excluded) to the time
+    its pages and those of the paths below it stay fresh. Paths without a
+    matching policy are not cached. The longest matching path wins.
+    """
+
+    def __init__(self, policies: Dict[str, timedelta], maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        """Initialize."""
+        self.policies = {path: ttl.total_seconds() for path, ttl in policies.items()}
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl(self, url: str) -> Optional[float]:
+        """Time to live in seconds for a URL, None if it must not be cached"""
+
+        path = url.split("?", 1)[0]
+        matches = [prefix for prefix in self.policies if _under(path, prefix)]
+        if not matches:
+            return None
+        return self.policies[max(matches, key=len)] or None
+
+    def get(self, url: str) -> Optional[str]:
+        """Returns the cached body if still fresh"""
+
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            expires, body = entry
+            if expires <= time.monotonic():
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return body
+
+    def put(self, url: str, body: str) -> None:
+        """Caches a body according to the URL policy"""
+
+        ttl = self.ttl(url)
+        if not ttl:
+            return
+        with self._lock:
+            self._entries[url] = (time.monotonic() + ttl, body)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, url: str = None) -> None:
+        """Drops the entries of `url` and of the paths below it, or every entry"""
+
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if _under(key, url)]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResultMemo:
+    """Bounded LRU of parsed results keyed by a hash of the page(s) they come from
+
+    Routers often return byte-identical pages between polls; memoizing on
+    the content skips parsing and validation for those. Cached results are
+    shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MEMO_SIZE) -> None:
+        """Initialize."""
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(parts: Iterable[str]) -> bytes:
+        """Content hash of the given strings"""
+
+        digest = blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.digest()
+
+    def get_or_build(self, parts: Iterable[str], build: Callable[[], Any]) -> Any:
+        """Returns the result memoized for `parts`, building it on a miss"""
+
+        if self.maxsize <= 0:
+            return build()
+        key = self.key(parts)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        result = build()
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        """Drops every memoized result"""
+
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
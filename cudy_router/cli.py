@@ -0,0 +1,193 @@
+"""`cudy-router` command: polls a fleet of routers and streams NDJSON records
+
+    cudy-router routers.json --once
+    cudy-router routers.json --interval 30 --output /var/log/cudy.ndjson
+    cudy-router routers.json --adaptive --min-interval 15 --max-interval 600
+    cudy-router routers.json --interval 15 --store fleet.db --output /dev/null
+
+The inventory is a JSON list of routers (`host`, `username`, `password`,
+optional `port` and `name`), an object with such a `routers` list, or JSON
+Lines with one router per line. Each poll of a router writes one
+`FleetResult` as a JSON line, flushed at once so the stream can be piped
+to a log shipper. Sessions are kept open between polls. With --adaptive,
+each collector of each router is polled at its own rate and only the
+changes are written (see `cudy_router.scheduler`). With --store, the
+records are also appended to a SQLite history (see `cudy_router.store`).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import sqlite3
+import sys
+from datetime import timedelta
+from typing import IO, List, Optional
+
+from .fleet import COLLECTORS, DEFAULT_CONCURRENCY, DEFAULT_JITTER, DEFAULT_ROUTER_TIMEOUT, FleetPoller
+from .models.fleet import FleetResult, RouterEntry
+from .router import MIN_TIME_BETWEEN_UPDATES
+from .scheduler import DEFAULT_MAX_INTERVAL, AdaptiveScheduler, IntervalPolicy
+from .store import SnapshotStore
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def load_inventory(path: str) -> List[RouterEntry]:
+    """Routers listed in an inventory file ("-" for stdin)"""
+
+    if path == "-":
+        content = sys.stdin.read()
+    else:
+        with open(path, encoding="utf-8") as inventory:
+            content = inventory.read()
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in content.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get("routers", [])
+    return [RouterEntry.model_validate(entry) for entry in data]
+
+
+def _write(output: IO[str], result: FleetResult) -> None:
+    output.write(result.model_dump_json())
+    output.write("\n")
+    output.flush()
+
+
+async def _collect(
+    poller: FleetPoller | AdaptiveScheduler,
+    output: IO[str],
+    interval: timedelta | None,
+    jitter: float,
+    store: Optional[SnapshotStore] = None,
+) -> int:
+    """Streams the results, returns the number of routers with errors"""
+
+    failed = 0
+    async with poller:
+        if isinstance(poller, AdaptiveScheduler):
+            results = poller.run()
+        elif interval is None:
+            results = poller.poll_once()
+        else:
+            results = poller.run(interval, jitter)
+        try:
+            async for result in results:
+                if result.errors:
+                    failed += 1
+                    _LOGGER.debug("%s: %s", result.router, result.errors)
+                _write(output, result)
+                if store is not None:
+                    # SQLite writes stay off the loop polling the other routers
+                    await asyncio.to_thread(store.record, result)
+        finally:
+            # Cancels the pending polls before the sessions are closed
+            await results.aclose()
+    return failed
+
+
+async def _run(
+    poller: FleetPoller | AdaptiveScheduler,
+    output: IO[str],
+    interval: timedelta | None,
+    jitter: float,
+    store: Optional[SnapshotStore] = None,
+) -> int:
+    task = asyncio.ensure_future(_collect(poller, output, interval, jitter, store))
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, task.cancel)
+        except (NotImplementedError, RuntimeError):  # pragma: no cover - Windows
+            pass
+    try:
+        return await task
+    except asyncio.CancelledError:
+        return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="cudy-router", description="Polls Cudy routers and writes one JSON line per router and poll"
+    )
+    parser.add_argument("inventory", help="JSON / JSON Lines file listing the routers, - for stdin")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--once", action="store_true", help="poll every router once, then exit (default)")
+    mode.add_argument("--interval", type=float, help="poll every router every INTERVAL seconds until stopped")
+    mode.add_argument(
+        "--adaptive", action="store_true", help="poll each collector as often as it changes until stopped"
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        help=f"seconds, with --adaptive (default {MIN_TIME_BETWEEN_UPDATES.total_seconds():g})",
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        help=f"seconds, with --adaptive (default {DEFAULT_MAX_INTERVAL.total_seconds():g})",
+    )
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER, help="random share of the interval")
+    parser.add_argument(
+        "--collect", default=",".join(COLLECTORS), help=f"comma separated collectors ({', '.join(COLLECTORS)})"
+    )
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="routers polled at once")
+    parser.add_argument(
+        "--timeout", type=float, default=DEFAULT_ROUTER_TIMEOUT.total_seconds(), help="seconds per router poll"
+    )
+    parser.add_argument("--output", "-o", help="append the records to this file instead of stdout")
+    parser.add_argument("--store", help="also append the records to this SQLite database")
+    parser.add_argument("--log-level", default="WARNING", help="logging level, logs go to stderr")
+    args = parser.parse_args(argv)
+
+    interval = timedelta(seconds=args.interval) if args.interval is not None else None
+    if interval is not None and interval <= timedelta(0):
+        parser.error("--interval must be positive")
+    if not args.adaptive:
+        for option, value in (("--min-interval", args.min_interval), ("--max-interval", args.max_interval)):
+            if value is not None:
+                parser.error(f"{option} only applies to --adaptive")
+
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr)
+    output: IO[str] = sys.stdout
+    store = None
+    try:
+        entries = load_inventory(args.inventory)
+        collect = [name.strip() for name in args.collect.split(",") if name.strip()]
+        timeout = timedelta(seconds=args.timeout)
+        if args.adaptive:
+            interval_policy = IntervalPolicy(
+                MIN_TIME_BETWEEN_UPDATES if args.min_interval is None else timedelta(seconds=args.min_interval),
+                DEFAULT_MAX_INTERVAL if args.max_interval is None else timedelta(seconds=args.max_interval),
+            )
+            poller = AdaptiveScheduler(
+                entries, concurrency=args.concurrency, timeout=timeout, collect=collect,
+                policies={collector: interval_policy for collector in collect},
+            )
+        else:
+            poller = FleetPoller(entries, concurrency=args.concurrency, timeout=timeout, collect=collect)
+        if args.output:
+            output = open(args.output, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        if args.store:
+            store = SnapshotStore(args.store)
+    except (OSError, ValueError, sqlite3.Error) as err:
+        if output is not sys.stdout:
+            output.close()
+        parser.error(str(err))
+
+    try:
+        failed = asyncio.run(_run(poller, output, interval, args.jitter, store))
+    finally:
+        if store is not None:
+            store.close()
+        if output is not sys.stdout:
+            output.close()
+    # With --once, the exit status tells whether every router could be polled
+    return 1 if failed and interval is None and not args.adaptive else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,29 @@
 """Helper methods to parse HTML returned by Cudy routers"""
 
-import re
-from datetime import datetime
-from typing import Any, List
-from dateutil.relativedelta import relativedelta
-from dateutil.parser import parse
-from bs4 import BeautifulSoup
+import heapq
+from html.parser import HTMLParser
+from typing import Any, Iterable, Iterator, List
+
+from .html_backend import HtmlDocument, SoupBackend, get_backend
+from .instrumentation import timed_parse
+from .primitives import QUOTED, SMS_CFG, band, parse_timestamp, percentile, seconds_duration, speed
+
+DEFAULT_TOP_N = 10
+
+
+@timed_parse
+def parse_document(input_html: str) -> HtmlDocument:
+    """Parses a page once so that several extractors can share the tree"""
+
+    return HtmlDocument(input_html)
+
+
+def _document(input_html: str | HtmlDocument) -> HtmlDocument:
+    """Returns the parsed page, parsing raw HTML if needed"""
+
+    if isinstance(input_html, HtmlDocument):
+        return input_html
+    return parse_document(input_html)
 
 
 def _add_unique(data: dict[str, Any], key: str, value: Any):
@@ -37,63 +55,6 @@ def _hex_as_int(string: str | None):
     return int(string, 16)
 
 
-def _band(raw_band_info: str):
-    """Gets band information"""
-
-    if raw_band_info:
-        match = re.compile(
-            r".*BAND\s*(?P<band>\d+)\s*/\s*(?P<bandwidth>\d+)\s*MHz.*"
-        ).match(raw_band_info)
-        if match:
-            return f"B{match.group('band')}"
-
-    return None
-
-def _seconds_duration(raw_duration: str) -> int:
-    """Parses string duration and returns it as seconds"""
-
-    if not raw_duration:
-        return None
-    duration_parts = raw_duration.lower().split()
-    duration = relativedelta()
-
-    for i, part in enumerate(duration_parts):
-        if part.count(":") == 2:
-            hours, minutes, seconds = part.split(":")
-            duration += relativedelta(
-                hours=_as_int(hours), minutes=_as_int(minutes), seconds=_as_int(seconds)
-            )
-        elif i == 0:
-            continue
-        elif part.startswith("year"):
-            duration += relativedelta(years=_as_int(duration_parts[i - 1]))
-        elif part.startswith("month"):
-            duration += relativedelta(months=_as_int(duration_parts[i - 1]))
-        elif part.startswith("week"):
-            duration += relativedelta(weeks=_as_int(duration_parts[i - 1]))
-        elif part.startswith("day"):
-            duration += relativedelta(days=_as_int(duration_parts[i - 1]))
-
-    # Get absolute duration from relative duration (considering different month lengths)
-    return (datetime.now() - (datetime.now() - duration)).total_seconds()
-
-
-def _speed(input_string: str) -> float:
-    """Parses transfer speed as megabits per second"""
-
-    if not input_string:
-        return None
-    if input_string.lower().endswith(" kbps"):
-        return round(float(input_string.split(" ")[0]) / 1024, 2)
-    if input_string.lower().endswith(" mbps"):
-        return float(input_string.split(" ")[0])
-    if input_string.lower().endswith(" gbps"):
-        return float(input_string.split(" ")[0]) * 1024
-    if input_string.lower().endswith(" bps"):
-        return round(float(input_string.split(" ")[0]) / 1024 / 1024, 2)
-    return 0
-
-
 def _signal_strength(rssi: int) -> int:
     """Gets the signal strength from the RSSI value"""
 
@@ -110,53 +71,62 @@ def _signal_strength(rssi: int) -> int:
     return ""
 
 
-def _parse_tables(input_html: str, include_headers: bool=False) -> dict[str, Any]:
+def _parse_tables(input_html: str | HtmlDocument, include_headers: bool=False) -> dict[str, Any]:
     """Parses an HTML table extracting key-value pairs"""
 
     data: dict[str, str] = {}
-    soup = BeautifulSoup(input_html, "html.parser")
-    tables = soup.find_all("table")
+    document = _document(input_html)
+    backend = document.backend
+    tables = backend.find_all(document.root, "table")
     for table in tables:
-        for row in table.find_all("tr"):
-            cols = row.css.select("td p.visible-xs")
+        for row in backend.find_all(table, "tr"):
+            cols = backend.select(row, "p", "visible-xs", inside="td")
             if include_headers:
-                cols = row.css.select("th") + cols
+                cols = backend.select(row, "th") + cols
             row_data: list[str] = []
             for col in cols:
-                stripped_text = col.text.strip()
+                stripped_text = backend.text(col).strip()
                 if stripped_text:
                     row_data.append(stripped_text)
             if len(row_data) > 1:
-                _add_unique(data, row_data[0], [re.sub("[\n]", "", r) for r in row_data[1:]])
+                _add_unique(data, row_data[0], [r.replace("\n", "") for r in row_data[1:]])
             elif len(row_data) == 1:
                 _add_unique(data, row_data[0], "")
 
     return data
 
 
-def _parse_onclick(input_html: str, cb_name: str) -> list:
+def _parse_onclick(input_html: str | HtmlDocument, cb_name: str) -> list:
     """ Retreive arguments for all buttons' onclick """
 
-    soup = BeautifulSoup(input_html, "html.parser")
-    buttons = soup.find_all('button', onclick=True)
-    pattern = re.compile(r"['\"]([^'\"]+)['\"]")
+    document = _document(input_html)
+    backend = document.backend
+    buttons = backend.find_all(document.root, "button")
     onclick_args = []
     for button in buttons:
-        onclick_attr: str = button['onclick']
-        if onclick_attr.startswith(cb_name):
-            args = pattern.findall(onclick_attr)
+        onclick_attr: str = backend.attr(button, "onclick")
+        if onclick_attr is not None and onclick_attr.startswith(cb_name):
+            args = QUOTED.findall(onclick_attr)
             if args:
                 onclick_args.append(args)
     return onclick_args
 
 
-def get_sim_value(input_html: str) -> int:
+@timed_parse
+def get_sim_value(input_html: str | HtmlDocument) -> int:
     """Gets the SIM slot value out of the displayed icon"""
 
-    soup = BeautifulSoup(input_html, "html.parser")
-    sim_icon = soup.css.select_one("i.icon[class*='sim']")
-    if sim_icon:
-        classnames = sim_icon.attrs["class"]
+    document = _document(input_html)
+    backend = document.backend
+    sim_icon = next(
+        (
+            icon for icon in backend.select(document.root, "i", "icon")
+            if "sim" in " ".join(backend.classes(icon))
+        ),
+        None,
+    )
+    if sim_icon is not None:
+        classnames = backend.classes(sim_icon)
         classname = next(
             iter([match for match in classnames if "sim" in match]),
             "",
@@ -168,46 +138,267 @@ def get_sim_value(input_html: str) -> int:
     return 0
 
 
-def get_all_devices(input_html: str) -> dict[str, Any]:
-    """Parses an HTML table extracting key-value pairs"""
+def _device_cell(cells: dict[str, str], div_id: str, content: str) -> None:
+    """Stores the values of one devlist cell (`*ipmac`, `*speed` or `*hostname`)"""
+
+    if "\n" in content:
+        if div_id.endswith("ipmac"):
+            cells["ip"], cells["mac"] = [x.strip() for x in content.split("\n")]
+        if div_id.endswith("speed"):
+            cells["up_speed"], cells["down_speed"] = [x.strip() for x in content.split("\n")]
+        if div_id.endswith("hostname"):
+            cells["hostname"] = content.split("\n")[0].strip()
+
+
+def _device(cells: dict[str, str]) -> dict[str, Any] | None:
+    """Builds a device out of the cells of one devlist row"""
+
+    if cells.get("mac") or cells.get("ip"):
+        return {
+            "hostname": cells.get("hostname"),
+            "ip": cells.get("ip"),
+            "mac": cells.get("mac"),
+            "up_speed": speed(cells.get("up_speed")),
+            "down_speed": speed(cells.get("down_speed")),
+        }
+    return None
+
+
+# Elements without end tag, and elements whose text is not part of `.text`
+_VOID_ELEMENTS = frozenset(
+    ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr")
+)
+_RAW_TEXT_ELEMENTS = frozenset(("script", "style", "template"))
+
+
+class _DevlistParser(HTMLParser):
+    """Incremental counterpart of the tree walk of `get_all_devices`
+
+    Open elements are kept on a stack and an end tag closes every element
+    opened since its start tag (end tags of elements that are not open are
+    ignored), as BeautifulSoup does with html.parser, so malformed markup
+    gives the same devices as the tree. Each `div` with an id inside a
+    `td` of a table row takes the text of its first `p.visible-xs`.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.devices: List[dict[str, Any]] = []
+        self._stack: List[tuple[str, Any]] = []
+        self._tables = 0
+        self._cells = 0
+        self._raw_text = 0
+        self._rows: List[dict[str, str]] = []
+        # Open divs still looking for their p: (id, cells of their row)
+        self._waiting: List[tuple[str, dict[str, str]]] = []
+        self._texts: List[List[str]] = []
+
+    def handle_starttag(self, tag: str, attrs: List[tuple[str, str | None]]) -> None:
+        if tag in _VOID_ELEMENTS:
+            if tag == "br":
+                for text in self._texts:
+                    text.append("\n")
+            return
+        state = None
+        if tag == "table":
+            self._tables += 1
+        elif tag == "td":
+            self._cells += 1
+        elif tag in _RAW_TEXT_ELEMENTS:
+            self._raw_text += 1
+        elif tag == "tr" and self._tables:
+            state = {}
+            self._rows.append(state)
+        elif tag == "div" and self._cells and self._rows:
+            div_id = dict(attrs).get("id")
+            if div_id:
+                state = (div_id, self._rows[-1])
+                self._waiting.append(state)
+        elif tag == "p" and self._waiting and "visible-xs" in (dict(attrs).get("class") or "").split():
+            state = (self._waiting, [])
+            self._waiting = []
+            self._texts.append(state[1])
+        self._stack.append((tag, state))
+
+    def handle_endtag(self, tag: str) -> None:
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                while len(self._stack) > depth:
+                    self._end(*self._stack.pop())
+                return
+
+    def handle_data(self, data: str) -> None:
+        if not self._raw_text:
+            for text in self._texts:
+                text.append(data)
+
+    def close(self) -> None:
+        super().close()
+        while self._stack:
+            self._end(*self._stack.pop())
+
+    def _end(self, tag: str, state: Any) -> None:
+        if tag == "table":
+            self._tables -= 1
+        elif tag == "td":
+            self._cells -= 1
+        elif tag in _RAW_TEXT_ELEMENTS:
+            self._raw_text -= 1
+        elif state is None:
+            return
+        elif tag == "tr":
+            self._rows.remove(state)
+            if device := _device(state):
+                self.devices.append(device)
+        elif tag == "div":
+            if state in self._waiting:
+                self._waiting.remove(state)
+        elif tag == "p":
+            divs, text = state
+            self._texts.remove(text)
+            content = "".join(text).strip()
+            for div_id, cells in divs:
+                _device_cell(cells, div_id, content)
+
+
+def iter_devices(input_html: str, chunk_size: int = 1 << 16) -> Iterator[dict[str, Any]]:
+    """Lazily yields the devices of the devlist page
+
+    Single forward pass over the page fed in chunks to an incremental
+    parser, without building a tree. Devices of a row are yielded once the
+    row is closed.
+    """
+
+    parser = _DevlistParser()
+    for start in range(0, len(input_html), chunk_size):
+        parser.feed(input_html[start:start + chunk_size])
+        yield from parser.devices
+        parser.devices.clear()
+    parser.close()
+    yield from parser.devices
+
+
+@timed_parse
+def get_all_devices(input_html: str | HtmlDocument) -> list[dict[str, Any]]:
+    """Parses an HTML table extracting key-value pairs
+
+    With the html.parser backend, raw HTML goes through the streaming
+    extractor, which skips building a soup. Otherwise the page is parsed
+    by the backend and walked as a tree, which is faster in lxml than a
+    pass of the pure Python parser.
+    """
+    if not isinstance(input_html, HtmlDocument):
+        if get_backend().name == SoupBackend.name:
+            return list(iter_devices(input_html))
+        input_html = parse_document(input_html)
+
     devices = []
-    soup = BeautifulSoup(input_html, "html.parser")
-    for br_element in soup.find_all("br"):
-        br_element.replace_with("\n" + br_element.text)
-    tables = soup.find_all("table")
+    backend = input_html.backend
+    tables = backend.find_all(input_html.root, "table")
     for table in tables:
-        for row in table.find_all("tr"):
-            ip, mac, up_speed, down_speed, hostname = [None, None, None, None, None]
-            cols = row.css.select("td div")
+        for row in backend.find_all(table, "tr"):
+            cells: dict[str, str] = {}
+            cols = backend.select(row, "div", inside="td")
             for col in cols:
-                div_id = col.attrs.get("id")
-                content_element = col.css.select_one("p.visible-xs")
-                if not div_id or not content_element:
+                div_id = backend.attr(col, "id")
+                content_element = next(iter(backend.select(col, "p", "visible-xs")), None)
+                if not div_id or content_element is None:
                     continue
-                content = content_element.text.strip()
-                if "\n" in content:
-                    if div_id.endswith("ipmac"):
-                        ip, mac = [x.strip() for x in content.split("\n")]
-                    if div_id.endswith("speed"):
-                        up_speed, down_speed = [x.strip() for x in content.split("\n")]
-                    if div_id.endswith("hostname"):
-                        hostname = content.split("\n")[0].strip()
-            if mac or ip:
-                devices.append(
-                    {
-                        "hostname": hostname,
-                        "ip": ip,
-                        "mac": mac,
-                        "up_speed": _speed(up_speed),
-                        "down_speed": _speed(down_speed),
-                    }
-                )
+                content = backend.text(content_element, line_breaks=True).strip()
+                _device_cell(cells, div_id, content)
+            if device := _device(cells):
+                devices.append(device)
 
     return devices
 
 
-def get_devices_info(input_html: str, devices_list: str | List[str]) -> dict[str, Any]:
-    """Parses devices page"""
+class _DevicesStats:
+    """Accumulates every devices statistic in a single pass over the devices"""
+
+    def __init__(self, top_n: int, groups: dict[str, Iterable[str]] | None) -> None:
+        self.top_n = max(1, top_n)
+        self.count = 0
+        self.total_down_speed = 0.0
+        self.total_up_speed = 0.0
+        self.down_speeds: list[float] = []
+        self.up_speeds: list[float] = []
+        # Min-heaps of (speed, -position, device): ties go to the first device, like max()
+        self.top_downloaders: list[tuple] = []
+        self.top_uploaders: list[tuple] = []
+        self.member_groups: dict[str, list[str]] = {}
+        self.groups: dict[str, dict[str, Any]] = {}
+        for group, members in (groups or {}).items():
+            self.groups[group] = {"device_count": 0, "total_up_speed": 0.0, "total_down_speed": 0.0}
+            for member in members:
+                self.member_groups.setdefault(member, []).append(group)
+
+    def _push(self, heap: list[tuple], speed: float, device: dict[str, Any]) -> None:
+        entry = (speed, -self.count, device)
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def add(self, device: dict[str, Any]) -> None:
+        down_speed = device.get("down_speed") or 0.0
+        up_speed = device.get("up_speed") or 0.0
+        self.total_down_speed += down_speed
+        self.total_up_speed += up_speed
+        self.down_speeds.append(down_speed)
+        self.up_speeds.append(up_speed)
+        self._push(self.top_downloaders, down_speed, device)
+        self._push(self.top_uploaders, up_speed, device)
+        if self.member_groups:
+            groups = set(self.member_groups.get(device.get("hostname"), ()))
+            groups.update(self.member_groups.get(device.get("mac"), ()))
+            for group in groups:
+                totals = self.groups[group]
+                totals["device_count"] += 1
+                totals["total_up_speed"] += up_speed
+                totals["total_down_speed"] += down_speed
+        self.count += 1
+
+    @staticmethod
+    def _top(heap: list[tuple]) -> list[dict[str, Any]]:
+        return [entry[2] for entry in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
+
+    @staticmethod
+    def _percentiles(speeds: list[float]) -> dict[str, float]:
+        speeds.sort()
+        return {f"p{percent}": percentile(speeds, percent) for percent in (50, 90, 99)}
+
+    def result(self) -> dict[str, Any]:
+        top_downloaders = self._top(self.top_downloaders)
+        top_uploaders = self._top(self.top_uploaders)
+        return {
+            "top_downloader_speed": top_downloaders[0].get("down_speed"),
+            "top_downloader_mac": top_downloaders[0].get("mac"),
+            "top_downloader_hostname": top_downloaders[0].get("hostname"),
+            "top_uploader_speed": top_uploaders[0].get("up_speed"),
+            "top_uploader_mac": top_uploaders[0].get("mac"),
+            "top_uploader_hostname": top_uploaders[0].get("hostname"),
+            "total_down_speed": self.total_down_speed or 0.0,
+            "total_up_speed": self.total_up_speed or 0.0,
+            "top_downloaders": top_downloaders,
+            "top_uploaders": top_uploaders,
+            "down_speed_percentiles": self._percentiles(self.down_speeds),
+            "up_speed_percentiles": self._percentiles(self.up_speeds),
+            "group_totals": self.groups,
+        }
+
+
+@timed_parse
+def get_devices_info(
+    input_html: str | HtmlDocument,
+    devices_list: str | List[str],
+    top_n: int = DEFAULT_TOP_N,
+    groups: dict[str, Iterable[str]] | None = None,
+) -> dict[str, Any]:
+    """Parses devices page
+
+    Statistics are computed in one pass: `top_n` top downloaders/uploaders,
+    speed percentiles and totals per group of hostnames/MACs (`groups`).
+    """
 
     devices = get_all_devices(input_html)
     data = {
@@ -215,33 +406,28 @@ def get_devices_info(input_html: str, devices_list: str | List[str]) -> dict[str
         "stats": {}
     }
     if devices:
-        top_download_device = max(devices, key=lambda item: item.get("down_speed"))
-        data['stats']["top_downloader_speed"] = top_download_device.get("down_speed")
-        data['stats']["top_downloader_mac"] = top_download_device.get("mac")
-        data['stats']["top_downloader_hostname"] = top_download_device.get("hostname")
-        top_upload_device = max(devices, key=lambda item: item.get("up_speed"))
-        data['stats']["top_uploader_speed"] = top_upload_device.get("up_speed")
-        data['stats']["top_uploader_mac"] = top_upload_device.get("mac")
-        data['stats']["top_uploader_hostname"] = top_upload_device.get("hostname")
-
-        data['devices'] = []
         if isinstance(devices_list, str):
             devices_list = [x.strip() for x in (devices_list or "*").split(",")]
-        data['devices'] = [device for device in devices if (devices_list[0] == "*" or device.get("hostname") in devices_list) or (device.get("mac") in devices_list)]
+        match_all = bool(devices_list) and devices_list[0] == "*"
+        wanted = set(devices_list)
 
-        data['stats']["total_down_speed"] = \
-            sum(device.get("down_speed") for device in devices) or 0.0
-
-        data['stats']["total_up_speed"] = \
-            sum(device.get("up_speed") for device in devices) or 0.0
+        stats = _DevicesStats(top_n, groups)
+        data['devices'] = []
+        for device in devices:
+            stats.add(device)
+            if match_all or device.get("hostname") in wanted or device.get("mac") in wanted:
+                data['devices'].append(device)
+        data['stats'] = stats.result()
 
     return data
 
 
-def get_modem_info(input_html: str) -> dict[str, Any]:
+@timed_parse
+def get_modem_info(input_html: str | HtmlDocument) -> dict[str, Any]:
     """Parses modem info page"""
 
-    raw_data = _parse_tables(input_html)
+    document = _document(input_html)
+    raw_data = _parse_tables(document)
     cellid = _hex_as_int(raw_data.get("Cell ID"))
     pcc = raw_data.get("PCC") or (
         f"BAND {raw_data.get('Band')} / {raw_data.get('DL Bandwidth')}"
@@ -257,16 +443,16 @@ def get_modem_info(input_html: str) -> dict[str, Any]:
             "name": (raw_data.get("Network Type") or "").replace(" ...", ""),
             "attributes": {"mcc": raw_data.get("MCC"), "mnc": raw_data.get("MNC")},
         },
-        "connected_time": _seconds_duration(raw_data.get("Connected Time")),
+        "connected_time": seconds_duration(raw_data.get("Connected Time")),
         "signal": _signal_strength(_as_int(raw_data.get("RSSI"))),
         "rssi": _as_int(raw_data.get("RSSI")),
         "rsrp": _as_int(raw_data.get("RSRP")),
         "rsrq": _as_int(raw_data.get("RSRQ")),
         "sinr": _as_int(raw_data.get("SINR")),
-        "sim": get_sim_value(input_html),
+        "sim": get_sim_value(document),
         "band": filter(
                     None,
-                    (_band(pcc), _band(scc1), _band(scc2), _band(scc3), _band(scc4)),
+                    (band(pcc), band(scc1), band(scc2), band(scc3), band(scc4)),
                 ),
         "cell": {
             "cell_id_hex": raw_data.get("Cell ID"),
@@ -278,19 +464,26 @@ def get_modem_info(input_html: str) -> dict[str, Any]:
     }
     return data
 
-def get_login_info(input_html: str) -> dict[str, Any]:
+@timed_parse
+def get_login_info(input_html: str | HtmlDocument) -> dict[str, Any]:
     """ parse the login screen to extract inpt fields """
 
     data: dict[str, str] = {}
-    soup = BeautifulSoup(input_html, "html.parser")
-    form_inputs = soup.find_all("input")
+    document = _document(input_html)
+    backend = document.backend
+    form_inputs = backend.find_all(document.root, "input")
     for form_input in form_inputs:
-        if name := form_input.attrs.get('name', form_input.attrs.get('id')):
-            data[name] = form_input.attrs.get('value', "")
+        name = backend.attr(form_input, 'name')
+        if name is None:
+            name = backend.attr(form_input, 'id')
+        if name:
+            value = backend.attr(form_input, 'value')
+            data[name] = value if value is not None else ""
     return data
 
 
-def get_sms_summary(input_html: str) -> dict[str, Any]:
+@timed_parse
+def get_sms_summary(input_html: str | HtmlDocument) -> dict[str, Any]:
     """Parses SMS summary"""
 
     raw_data = _parse_tables(input_html, include_headers=True)
@@ -304,13 +497,15 @@ def get_sms_summary(input_html: str) -> dict[str, Any]:
     return data
 
 
-def get_sms_list(input_html: str) -> dict[str, Any]:
+@timed_parse
+def get_sms_list(input_html: str | HtmlDocument) -> dict[str, Any]:
     """Parses SMS list table"""
 
-    sms_list = _parse_tables(input_html)
-    onclick_args = _parse_onclick(input_html, "cbi_show_modal")
+    document = _document(input_html)
+    sms_list = _parse_tables(document)
+    onclick_args = _parse_onclick(document, "cbi_show_modal")
     readsms_args = [arg[1] for arg in onclick_args if "readsms" in arg[0]]
-    sms_cfgs = (re.search(r"cfg=([a-z0-9]+)", readsms).group(1) for readsms in readsms_args)
+    sms_cfgs = (SMS_CFG.search(readsms).group(1) for readsms in readsms_args)
 
     sms_messages = []
     for index, values in sms_list.items():
@@ -318,21 +513,23 @@ def get_sms_list(input_html: str) -> dict[str, Any]:
             'index': _as_int(index),
             'phone_number': values[0],
             'text': values[1],
-            'timestamp': parse(values[2]),
+            'timestamp': parse_timestamp(values[2]),
             'cfg': next(sms_cfgs)
         })
 
     return sms_messages
 
 
-def read_sms(input_html) -> dict[str, Any]:
+@timed_parse
+def read_sms(input_html: str | HtmlDocument) -> dict[str, Any]:
     """ read sms from the router """
 
-    soup = BeautifulSoup(input_html, "html.parser")
-    phone_input = soup.find("input", id="cbid.smsread.1.phone")
-    text_textarea = soup.find("textarea", id="cbid.smsread.1.text")
+    document = _document(input_html)
+    backend = document.backend
+    phone_input = backend.find(document.root, "input", "cbid.smsread.1.phone")
+    text_textarea = backend.find(document.root, "textarea", "cbid.smsread.1.text")
 
     return {
-        'phone_number': phone_input['value'] if phone_input else "",
-        'text': text_textarea.contents[0] if text_textarea else ""
+        'phone_number': backend.attr(phone_input, 'value') if phone_input is not None else "",
+        'text': backend.text(text_textarea) if text_textarea is not None else ""
     }
@@ -0,0 +1,110 @@
+"""Device presence tracking with incremental diffs between polls"""
+
+from typing import Dict, Iterable, List, Optional, Set
+
+from .devices_manager import DevicesManager
+from .models.device import Device, DeviceChange, DevicesDiff, DevicesInfo
+
+# Speeds are in Mbps
+DEFAULT_SPEED_THRESHOLD = 1.0
+
+
+class DeviceTracker:
+    """Keeps a MAC-keyed index of the connected devices
+
+    Each poll yields only what changed since the previous one: devices that
+    joined or left, IP and hostname changes, and up/down speeds crossing
+    `speed_threshold`. `hostnames`/`macs` restrict tracking to some devices.
+    """
+
+    def __init__(
+        self,
+        devices_manager: DevicesManager,
+        speed_threshold: float = DEFAULT_SPEED_THRESHOLD,
+        hostnames: Optional[Iterable[str]] = None,
+        macs: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Initialize."""
+        self.devices_manager = devices_manager
+        self.speed_threshold = speed_threshold
+        self.hostnames: Optional[Set[str]] = set(hostnames) if hostnames is not None else None
+        self.macs: Optional[Set[str]] = set(macs) if macs is not None else None
+        self._devices: Dict[str, Device] = {}
+        self._hostnames: Dict[str, Set[str]] = {}
+        self._last_info: Optional[DevicesInfo] = None
+
+    @property
+    def devices(self) -> Dict[str, Device]:
+        """Currently connected devices by MAC address"""
+
+        return dict(self._devices)
+
+    def __contains__(self, mac: str) -> bool:
+        return mac in self._devices
+
+    def get(self, mac: str) -> Optional[Device]:
+        """Connected device with this MAC address, if any"""
+
+        return self._devices.get(mac)
+
+    def by_hostname(self, hostname: str) -> List[Device]:
+        """Connected devices announcing this hostname"""
+
+        return [self._devices[mac] for mac in self._hostnames.get(hostname, ())]
+
+    def poll(self) -> DevicesDiff:
+        """Retrieves the devices from the router and returns the changes"""
+
+        devices_info = self.devices_manager.get_devices()
+        # Memoized managers hand back the very same object for an unchanged page
+        if devices_info is self._last_info:
+            return DevicesDiff()
+        self._last_info = devices_info
+        return self.update(devices_info.devices)
+
+    def _tracked(self, device: Device) -> bool:
+        if self.hostnames is None and self.macs is None:
+            return True
+        return (
+            (self.hostnames is not None and device.hostname in self.hostnames)
+            or (self.macs is not None and device.mac in self.macs)
+        )
+
+    def update(self, devices: Iterable[Device]) -> DevicesDiff:
+        """Updates the index from a full device list and returns the changes"""
+
+        diff = DevicesDiff()
+        current: Dict[str, Device] = {}
+        for device in devices:
+            if not self._tracked(device):
+                continue
+            current[device.mac] = device
+            previous = self._devices.get(device.mac)
+            if previous is None:
+                diff.joined.append(device)
+            else:
+                diff.changed.extend(self._changes(previous, device))
+
+        diff.left = [device for mac, device in self._devices.items() if mac not in current]
+
+        self._devices = current
+        self._hostnames = {}
+        for mac, device in current.items():
+            self._hostnames.setdefault(device.hostname, set()).add(mac)
+        return diff
+
+    def _changes(self, previous: Device, device: Device) -> List[DeviceChange]:
+        changes = [
+            DeviceChange(mac=device.mac, field=field, old=getattr(previous, field), new=getattr(device, field))
+            for field in ("ip", "hostname")
+            if getattr(previous, field) != getattr(device, field)
+        ]
+        for field in ("up_speed", "down_speed"):
+            old, new = getattr(previous, field), getattr(device, field)
+            if (old >= self.speed_threshold) != (new >= self.speed_threshold):
+                changes.append(DeviceChange(mac=device.mac, field=field, old=old, new=new))
+        return changes
+
+
+def get_device_tracker(devices_manager: DevicesManager, **kwargs) -> DeviceTracker:
+    return DeviceTracker(devices_manager, **kwargs)
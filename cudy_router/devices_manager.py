@@ -1,27 +1,85 @@
 """Modem Manager"""
 
-from typing import List, Union
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
 
 from . import CudyRouter
 from . import cudy_parser
+from .cache import DEFAULT_MEMO_SIZE, ResultMemo
 from .models.device import DevicesInfo
+from .models.lite import build_model
+
+if TYPE_CHECKING:
+    from .async_router import AsyncCudyRouter
+
+DEVICES_URL = "admin/network/devices/devlist?detail=1"
 
 
 class DevicesManager:
-    def __init__(self, cudy_router):
-        """Initialize."""
+    def __init__(self, cudy_router, memo_size: int = DEFAULT_MEMO_SIZE, lite: bool = False):
+        """Initialize.
+
+        Results are memoized on the content of the fetched page, keeping
+        up to `memo_size` of them (0 disables it). With `lite`, results are
+        slotted dataclasses built without pydantic validation.
+        """
         self.cudy_router = cudy_router
+        self.lite = lite
+        self._memo = ResultMemo(memo_size)
+
+    def  get_devices(
+        self,
+        devices_list: Union[str, List[str]] = "*",
+        top_n: int = cudy_parser.DEFAULT_TOP_N,
+        groups: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> DevicesInfo:
+        """Retrieves devices infos from the router
+
+        Stats include the `top_n` top downloaders/uploaders and, when
+        `groups` maps group names to hostnames/MACs, per-group totals.
+        """
+
+        return self._devices_info(self.cudy_router.get(DEVICES_URL), devices_list, top_n, groups)
+
+    def _devices_info(
+        self,
+        devices_html: str,
+        devices_list: Union[str, List[str]],
+        top_n: int = cudy_parser.DEFAULT_TOP_N,
+        groups: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> DevicesInfo:
+        """Parses and validates the devices page"""
 
-    def  get_devices(self, devices_list: Union[str, List[str]] = "*") -> DevicesInfo:
-        """Retrieves devices infos from the router"""
+        if groups:
+            groups = {group: list(members) for group, members in groups.items()}
 
-        devices_info = cudy_parser.get_devices_info(
-            self.cudy_router.get("admin/network/devices/devlist?detail=1"),
-            devices_list,
+        def build() -> DevicesInfo:
+            devices_info = cudy_parser.get_devices_info(devices_html, devices_list, top_n, groups)
+            return build_model(DevicesInfo, devices_info, self.lite)
+
+        return self._memo.get_or_build(
+            ["devices", repr(devices_list), str(top_n), repr(groups), devices_html], build
         )
 
-        return DevicesInfo.model_validate(devices_info)
+
+class AsyncDevicesManager(DevicesManager):
+    """asyncio counterpart of `DevicesManager` working with an `AsyncCudyRouter`"""
+
+    async def get_devices(
+        self,
+        devices_list: Union[str, List[str]] = "*",
+        top_n: int = cudy_parser.DEFAULT_TOP_N,
+        groups: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> DevicesInfo:
+        """Retrieves devices infos from the router, parsed off the event loop"""
+
+        return await self.cudy_router.parse(
+            self._devices_info, await self.cudy_router.get(DEVICES_URL), devices_list, top_n, groups
+        )
 
 
 def get_devices_manager(cudy_router: CudyRouter) -> DevicesManager:
     return DevicesManager(cudy_router)
+
+
+def get_async_devices_manager(cudy_router: "AsyncCudyRouter") -> AsyncDevicesManager:
+    return AsyncDevicesManager(cudy_router)
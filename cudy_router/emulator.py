@@ -0,0 +1,491 @@
+"""Emulates the LuCI web interface of Cudy routers for load and latency testing
+
+Each `RouterEmulator` keeps the state of one router (sessions, clients,
+messages) and renders the pages this library reads: the 403 login form with
+salt/token/_csrf, the `sysauth` session cookie, gcom status, devlist and the
+SMS pages. `EmulatorServer` serves many of them, one port each, from a single
+asyncio event loop with configurable latency and error injection.
+
+    python -m cudy_router.emulator --routers 100 --base-port 8000 --devices 50
+"""
+
+import argparse
+import asyncio
+import html
+import logging
+import random
+import secrets
+import time
+import urllib.parse
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Dict, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+ROOT = "/cgi-bin/luci"
+
+# LuCI default `sessiontime`
+DEFAULT_SESSION_TIMEOUT = timedelta(hours=1)
+DEFAULT_DEVICES = 10
+DEFAULT_MESSAGES = 5
+# Login forms handed out and not yet posted, per router
+MAX_PENDING_LOGINS = 256
+
+_REASONS = {200: "OK", 302: "Found", 403: "Forbidden", 404: "Not Found", 500: "Internal Server Error"}
+_SPEED_UNITS = ((1024 * 1024, "Gbps"), (1024, "Mbps"), (1, "Kbps"))
+_CONNECTIONS = ("Wired", "2.4G WiFi", "5G WiFi")
+
+Response = Tuple[int, Dict[str, str], str]
+
+
+@dataclass
+class EmulatedDevice:
+    """A client connected to an emulated router"""
+
+    hostname: str
+    ip: str
+    mac: str
+    connection: str
+    max_speed: float
+
+
+@dataclass
+class EmulatedSMS:
+    """A message stored by an emulated router"""
+
+    cfg: str
+    phone_number: str
+    text: str
+    timestamp: datetime
+    box: str = "inbox"
+    new: bool = False
+
+
+def _page(body: str) -> str:
+    return (
+        '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>Cudy</title>'
+        '<script src="/luci-static/resources/cbi.js"></script></head>\n'
+        f'<body><div class="container">\n{body}</div></body></html>\n'
+    )
+
+
+def _row(label: str, value: str) -> str:
+    return (
+        f'<tr><td class="col-xs-5"><p class="hidden-xs">{label}</p><p class="visible-xs">{label}</p></td>'
+        f'<td class="col-xs-7"><p class="hidden-xs">{value}</p><p class="visible-xs">{value}</p></td></tr>\n'
+    )
+
+
+def _speed(kbps: float) -> str:
+    for factor, unit in _SPEED_UNITS:
+        if kbps >= factor:
+            return f"{kbps / factor:.1f} {unit}"
+    return f"{int(kbps * 1024)} bps"
+
+
+def _duration(seconds: float) -> str:
+    days, seconds = divmod(int(seconds), 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{days} Day {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+class RouterEmulator:
+    """State and pages of one emulated router
+
+    `handle()` maps a request to a response without any I/O so the emulator
+    can also be driven directly. Every response is delayed by `latency` plus
+    up to `jitter` seconds, a share `error_rate` of them are HTTP 500 and a
+    share `drop_rate` of connections are closed without response. Sessions
+    expire after `session_timeout` without request, or at once with
+    `expire_sessions()`.
+    """
+
+    def __init__(
+        self,
+        username: str = "admin",
+        password: str = "admin",
+        devices: int = DEFAULT_DEVICES,
+        messages: int = DEFAULT_MESSAGES,
+        session_timeout: timedelta = DEFAULT_SESSION_TIMEOUT,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        """Initialize."""
+        self.username = username
+        self.password = password
+        self.session_timeout = session_timeout
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.started = time.time()
+        self.salt = secrets.token_hex(4)
+        self.devices = [self._device(index) for index in range(devices)]
+        self.messages = [
+            EmulatedSMS(
+                cfg=f"{index:08x}",
+                phone_number=f"+3361234{index:04d}",
+                text=f"Message {index}\nfrom the emulator",
+                timestamp=datetime.now().replace(microsecond=0) - timedelta(hours=index),
+            )
+            for index in range(messages)
+        ]
+        self.stats = {"requests": 0, "logins": 0, "failed_logins": 0, "expired": 0, "errors": 0}
+        self._sessions: Dict[str, float] = {}
+        self._tokens: Dict[str, str] = {}
+
+    def _device(self, index: int) -> EmulatedDevice:
+        return EmulatedDevice(
+            hostname=f"client-{index}",
+            ip=f"192.168.{10 + index // 250}.{index % 250 + 2}",
+            mac=":".join(f"{byte:02X}" for byte in (0xAA, 0xBB, 0xCC, index >> 16, (index >> 8) & 255, index & 255)),
+            connection=_CONNECTIONS[index % len(_CONNECTIONS)],
+            max_speed=self.random.choice((64, 1024, 20 * 1024, 300 * 1024)),
+        )
+
+    def receive_sms(self, phone_number: str, text: str) -> EmulatedSMS:
+        """Adds a new message to the inbox"""
+
+        sms = EmulatedSMS(
+            cfg=secrets.token_hex(4),
+            phone_number=phone_number,
+            text=text,
+            timestamp=datetime.now().replace(microsecond=0),
+            new=True,
+        )
+        self.messages.insert(0, sms)
+        return sms
+
+    def expire_sessions(self) -> None:
+        """Ends every session, as a router reboot or timeout would"""
+
+        self._sessions.clear()
+
+    async def delay(self) -> None:
+        """Waits for the configured response latency"""
+
+        latency = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def drop(self) -> bool:
+        """Whether to close the connection without answering"""
+
+        return self.drop_rate > 0 and self.random.random() < self.drop_rate
+
+    def handle(self, method: str, path: str, headers: Dict[str, str], body: bytes = b"") -> Response:
+        """Answers one request"""
+
+        self.stats["requests"] += 1
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return 500, {}, "Internal Server Error"
+        if path == ROOT and method == "POST":
+            return self._login(body)
+        if not path.startswith(ROOT + "/") or not self._session(headers.get("cookie", "")):
+            return self._login_page()
+        if method == "POST":
+            return 200, {}, "OK"
+        page = self._render(path[len(ROOT) + 1:])
+        if page is None:
+            return 404, {}, "Not Found"
+        return 200, {}, page
+
+    def _session(self, cookies: str) -> bool:
+        """Whether the request carries a live session, dropping an expired one"""
+
+        session = next(
+            (value for name, _, value in (cookie.strip().partition("=") for cookie in cookies.split(";"))
+             if name == "sysauth"),
+            None,
+        )
+        expires = self._sessions.get(session)
+        if expires is None:
+            return False
+        now = time.monotonic()
+        if expires <= now:
+            del self._sessions[session]
+            self.stats["expired"] += 1
+            return False
+        # Like LuCI, every request extends the session
+        self._sessions[session] = now + self.session_timeout.total_seconds()
+        return True
+
+    def _login_page(self) -> Response:
+        token, csrf = secrets.token_hex(8), secrets.token_hex(8)
+        self._tokens[csrf] = token
+        if len(self._tokens) > MAX_PENDING_LOGINS:
+            del self._tokens[next(iter(self._tokens))]
+        form = (
+            f'<form method="post" action="{ROOT}">'
+            '<input type="hidden" name="zonename" value=""><input type="hidden" name="timeclock" value="">'
+            f'<input type="hidden" name="salt" value="{self.salt}">'
+            f'<input type="hidden" name="token" value="{token}">'
+            f'<input type="hidden" name="_csrf" value="{csrf}">'
+            '<input type="hidden" name="luci_password" value="">'
+            f'<input name="luci_username" value="{html.escape(self.username)}">'
+            '<input id="luci_password2" type="password"></form>\n'
+        )
+        return 403, {}, _page(form)
+
+    def _login(self, body: bytes) -> Response:
+        form = dict(urllib.parse.parse_qsl(body.decode("utf-8", "replace")))
+        token = self._tokens.pop(form.get("_csrf", ""), None)
+        expected = sha256((self.password + self.salt).encode("utf-8")).hexdigest()
+        if token is not None:
+            expected = sha256((expected + token).encode("utf-8")).hexdigest()
+        if token is None or form.get("luci_username") != self.username or form.get("luci_password") != expected:
+            self.stats["failed_logins"] += 1
+            return self._login_page()
+        self.stats["logins"] += 1
+        now = time.monotonic()
+        # Clients logging in again usually abandon their previous session
+        for expired in [session for session, expires in self._sessions.items() if expires <= now]:
+            del self._sessions[expired]
+        session = secrets.token_hex(16)
+        self._sessions[session] = now + self.session_timeout.total_seconds()
+        return 302, {
+            "Location": f"{ROOT}/admin/panel",
+            "Set-Cookie": f"sysauth={session}; path={ROOT}/; HttpOnly",
+        }, ""
+
+    def _render(self, path: str) -> Optional[str]:
+        route, _, query = path.partition("?")
+        arguments = dict(urllib.parse.parse_qsl(query))
+        if route == "admin/network/gcom/status":
+            return self._status_detail() if arguments.get("detail") == "1" else self._status()
+        if route == "admin/network/devices/devlist":
+            return self._devlist()
+        if route == "admin/network/gcom/sms/status":
+            return self._sms_status()
+        if route == "admin/network/gcom/sms/smslist":
+            return self._sms_list("outbox" if arguments.get("smsbox") == "sto" else "inbox")
+        if route == "admin/network/gcom/sms/readsms":
+            return self._read_sms(arguments.get("cfg"))
+        return None
+
+    def _status(self) -> str:
+        return _page(
+            '<table class="table">\n'
+            + _row("Network Type", "LTE ...")
+            + _row("Connected Time", _duration(time.time() - self.started))
+            + _row("SIM Card", '<i class="icon icon-sim1 text-primary"></i> SIM 1')
+            + "</table>\n"
+        )
+
+    def _status_detail(self) -> str:
+        rssi = self.random.randint(10, 31)
+        rows = [
+            ("Network Type", "LTE ..."), ("MCC", "208"), ("MNC", "01"), ("Cell ID", "1A2B3C4"),
+            ("PCID", "123"), ("RSSI", str(rssi)), ("RSRP", str(self.random.randint(-110, -80))),
+            ("RSRQ", str(self.random.randint(-15, -5))), ("SINR", str(self.random.randint(0, 25))),
+            ("PCC", "BAND 3 / 20 MHz"), ("SCC", "BAND 7 / 20 MHz"),
+        ]
+        return _page('<table class="table">\n' + "".join(_row(*row) for row in rows) + "</table>\n")
+
+    def _devlist(self) -> str:
+        rows = []
+        for index, device in enumerate(self.devices, start=1):
+            upload = _speed(self.random.uniform(0, device.max_speed / 8))
+            download = _speed(self.random.uniform(0, device.max_speed))
+            rows.append(
+                f'<tr id="cbi-table-{index}">'
+                f'<td><div id="cbi-table-{index}-ipmac"><p class="visible-xs">{device.ip}<br>{device.mac}</p></div></td>'
+                f'<td><div id="cbi-table-{index}-speed"><p class="visible-xs">{upload}<br>{download}</p></div></td>'
+                f'<td><div id="cbi-table-{index}-hostname"><p class="visible-xs">'
+                f'{html.escape(device.hostname)}<br>{device.connection}</p></div></td></tr>\n'
+            )
+        return _page(
+            '<table class="table"><tr><th>IP/MAC</th><th>Speed</th><th>Hostname</th></tr>\n'
+            + "".join(rows) + "</table>\n"
+        )
+
+    def _sms_status(self) -> str:
+        counts = (
+            ("New Message", sum(sms.new for sms in self.messages)),
+            ("Inbox", sum(sms.box == "inbox" for sms in self.messages)),
+            ("Outbox", sum(sms.box == "outbox" for sms in self.messages)),
+        )
+        return _page(
+            '<table class="table">\n'
+            + "".join(f'<tr><th>{label}</th><td><p class="visible-xs">{count}</p></td></tr>\n' for label, count in counts)
+            + "</table>\n"
+        )
+
+    def _sms_list(self, box: str) -> str:
+        cudy_box = "sto" if box == "outbox" else "rec"
+        rows = []
+        for index, sms in enumerate((sms for sms in self.messages if sms.box == box), start=1):
+            rows.append(
+                f'<tr><td><p class="visible-xs">{index}</p></td>'
+                f'<td><p class="visible-xs">{html.escape(sms.phone_number)}</p></td>'
+                f'<td><p class="visible-xs">{html.escape(sms.text)}</p></td>'
+                f'<td><p class="visible-xs">{sms.timestamp:%Y-%m-%d %H:%M:%S}</p></td>'
+                f"<td><button class=\"btn\" onclick=\"cbi_show_modal('{ROOT}/admin/network/gcom/sms/readsms', "
+                f"'{ROOT}/admin/network/gcom/sms/readsms?cfg={sms.cfg}&amp;smsbox={cudy_box}')\">Read</button></td></tr>\n"
+            )
+        return _page('<table class="table">\n' + "".join(rows) + "</table>\n")
+
+    def _read_sms(self, cfg: Optional[str]) -> Optional[str]:
+        sms = next((sms for sms in self.messages if sms.cfg == cfg), None)
+        if sms is None:
+            return None
+        sms.new = False
+        return _page(
+            '<form><input type="text" id="cbid.smsread.1.phone" name="cbid.smsread.1.phone" '
+            f'value="{html.escape(sms.phone_number)}">'
+            f'<textarea id="cbid.smsread.1.text">{html.escape(sms.text)}</textarea></form>\n'
+        )
+
+
+class EmulatorServer:
+    """Serves emulated routers over HTTP/1.1, one port each, from one event loop"""
+
+    def __init__(self, routers: List[RouterEmulator], host: str = "127.0.0.1", base_port: int = 0) -> None:
+        """Initialize.
+
+        Routers listen on consecutive ports from `base_port`, or on ports
+        picked by the system when it is 0.
+        """
+        self.routers = routers
+        self.host = host
+        self.base_port = base_port
+        self.ports: List[int] = []
+        self._servers: List[asyncio.AbstractServer] = []
+
+    async def __aenter__(self) -> "EmulatorServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Starts listening for every router"""
+
+        for index, router in enumerate(self.routers):
+            port = self.base_port + index if self.base_port else 0
+            server = await asyncio.start_server(
+                lambda reader, writer, router=router: self._serve(router, reader, writer),
+                self.host, port,
+            )
+            self._servers.append(server)
+            self.ports.append(server.sockets[0].getsockname()[1])
+
+    async def close(self) -> None:
+        """Stops listening"""
+
+        for server in self._servers:
+            server.close()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers.clear()
+
+    async def serve_forever(self) -> None:
+        """Serves until cancelled"""
+
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def _serve(self, router: RouterEmulator, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of one keep-alive connection"""
+
+        try:
+            while request := await self._read_request(reader):
+                method, path, headers, body = request
+                await router.delay()
+                if router.drop():
+                    break
+                status, extra_headers, page = router.handle(method, path, headers, body)
+                payload = page.encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                head = [
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                    "Content-Type: text/html; charset=utf-8",
+                    f"Content-Length: {len(payload)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                    *(f"{name}: {value}" for name, value in extra_headers.items()),
+                ]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as error:
+            _LOGGER.debug("Connection error: %s", error)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        headers: Dict[str, str] = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+
+def get_emulator_server(count: int = 1, host: str = "127.0.0.1", base_port: int = 0, **kwargs) -> EmulatorServer:
+    """`count` routers sharing the same settings (see `RouterEmulator`)"""
+
+    seed = kwargs.pop("seed", None)
+    return EmulatorServer(
+        [
+            RouterEmulator(seed=None if seed is None else seed + index, **kwargs)
+            for index in range(count)
+        ],
+        host,
+        base_port,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Emulates Cudy routers for load testing")
+    parser.add_argument("--routers", type=int, default=1, help="number of routers, one port each")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=8000)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="clients per router")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES, help="SMS per router")
+    parser.add_argument("--session-timeout", type=float, default=DEFAULT_SESSION_TIMEOUT.total_seconds(), help="seconds")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of HTTP 500 responses")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="share of dropped connections")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = get_emulator_server(
+        args.routers, args.host, args.base_port,
+        username=args.username, password=args.password,
+        devices=args.devices, messages=args.messages,
+        session_timeout=timedelta(seconds=args.session_timeout),
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, drop_rate=args.drop_rate, seed=args.seed,
+    )
+
+    async def serve() -> None:
+        async with server:
+            print(f"Emulating {len(server.ports)} routers on {args.host}:{server.ports[0]}-{server.ports[-1]}")
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Errors raised when a router cannot be queried"""
+
+import time
+
+
+class CudyRouterError(Exception):
+    """Base class of the errors raised by this library"""
+
+
+class RouterConnectionError(CudyRouterError):
+    """The router could not be reached"""
+
+
+class RouterTimeoutError(RouterConnectionError):
+    """The router did not answer in time"""
+
+
+class RouterHTTPError(CudyRouterError):
+    """The router answered with an HTTP error status"""
+
+    def __init__(self, status: int, url: str) -> None:
+        super().__init__(f"HTTP {status} from {url}")
+        self.status = status
+        self.url = url
+
+
+class AuthenticationError(CudyRouterError):
+    """The router refused the credentials"""
+
+
+class CircuitOpenError(CudyRouterError):
+    """The router failed repeatedly and is not queried until `retry_at`"""
+
+    def __init__(self, router: str, retry_at: float) -> None:
+        super().__init__(f"{router} is failing, next attempt in {max(0.0, retry_at - time.monotonic()):.0f}s")
+        self.router = router
+        # time.monotonic() value
+        self.retry_at = retry_at
@@ -0,0 +1,201 @@
+"""Concurrent collection across a fleet of Cudy routers"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, Union
+
+from pydantic import BaseModel
+
+from .async_router import AsyncCudyRouter
+from .devices_manager import AsyncDevicesManager
+from .exceptions import AuthenticationError, CircuitOpenError, RouterConnectionError
+from .modem_manager import AsyncModemManager
+from .sms_manager import AsyncSMSManager
+from .models.fleet import FleetResult, RouterEntry
+from .resilience import CircuitBreaker, RequestPolicy
+from .router import SCAN_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+COLLECTORS = ("modem", "devices", "sms_summary")
+
+DEFAULT_CONCURRENCY = 10
+DEFAULT_ROUTER_TIMEOUT = timedelta(seconds=10)
+DEFAULT_JITTER = 0.1
+
+# Errors meaning no collector can succeed on this poll
+_ROUTER_DOWN_ERRORS = (AuthenticationError, CircuitOpenError, RouterConnectionError)
+
+
+# A poll can only repeat the previous one, so each manager keeps a single
+# result: enough for the memo to hit and bounded across a large fleet
+FLEET_MEMO_SIZE = 1
+
+
+class FleetRouter:
+    """A router of the fleet with its managers.
+
+    It is kept between polls, so a page that did not change since the last
+    poll is answered from the memo of its manager instead of parsed again.
+    """
+
+    def __init__(self, router: AsyncCudyRouter, memo_size: int = FLEET_MEMO_SIZE) -> None:
+        """Initialize."""
+        self.router = router
+        self.modem = AsyncModemManager(router, memo_size=memo_size)
+        self.devices = AsyncDevicesManager(router, memo_size=memo_size)
+        self.sms = AsyncSMSManager(router, memo_size=memo_size)
+
+    async def collect(self, collector: str) -> BaseModel:
+        """Runs one of the COLLECTORS, its result is the `FleetResult` field of the same name"""
+
+        if collector == "modem":
+            return await self.modem.get_modem_info()
+        if collector == "devices":
+            return await self.devices.get_devices()
+        if collector == "sms_summary":
+            return await self.sms.get_sms_summary()
+        raise ValueError(f"Unknown collector {collector}")
+
+    async def close(self) -> None:
+        await self.router.close()
+
+
+class FleetPoller:
+    """Polls many routers concurrently with bounded parallelism.
+
+    At most `concurrency` routers are polled at once and each router poll is
+    cut off after `timeout`, so a hung router only delays its own result.
+    Pages are parsed in worker threads, so a large one does not hold up the
+    event loop either. Results are streamed back as soon as each router
+    completes.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[Union[RouterEntry, dict]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: timedelta = DEFAULT_ROUTER_TIMEOUT,
+        collect: Iterable[str] = COLLECTORS,
+        policy: RequestPolicy | None = None,
+    ) -> None:
+        """Initialize.
+
+        Routers failing repeatedly are skipped for a while, as set by
+        `policy` (see RequestPolicy).
+        """
+        self.entries = [RouterEntry.model_validate(entry) for entry in entries]
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.collect = tuple(collect)
+        self.policy = policy
+        unknown = set(self.collect) - set(COLLECTORS)
+        if unknown:
+            raise ValueError(f"Unknown collectors: {', '.join(sorted(unknown))}")
+        self._routers: Dict[str, FleetRouter] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+
+    async def __aenter__(self) -> "FleetPoller":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Closes the sessions kept open to every router."""
+
+        routers = list(self._routers.values())
+        self._routers.clear()
+        await asyncio.gather(*(router.close() for router in routers))
+
+    def _router(self, entry: RouterEntry) -> FleetRouter:
+        """Returns the router for an entry, keeping its session and managers between polls"""
+
+        router = self._routers.get(entry.router_id)
+        if router is None:
+            router = FleetRouter(
+                AsyncCudyRouter(entry.host, entry.username, entry.password, entry.port, policy=self.policy)
+            )
+            self._routers[entry.router_id] = router
+        return router
+
+    async def _collect(self, entry: RouterEntry, result: FleetResult) -> None:
+        """Runs every collector against one router, filling `result` in place"""
+
+        router = self._router(entry)
+        if router.router.breaker.state == CircuitBreaker.OPEN:
+            result.errors["circuit"] = f"{entry.router_id} is failing, skipped"
+            return
+        # Requests log in as needed, failures surface as the typed errors of the router
+        for collector in self.collect:
+            try:
+                setattr(result, collector, await router.collect(collector))
+            except Exception as err:  # pylint: disable=broad-except
+                result.errors[collector] = f"{type(err).__name__}: {err}"
+                if isinstance(err, _ROUTER_DOWN_ERRORS):
+                    # The other collectors would fail the same way
+                    return
+
+    async def poll_router(self, entry: RouterEntry) -> FleetResult:
+        """Polls one router within the concurrency and time limits"""
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            result = FleetResult(router=entry.router_id, timestamp=datetime.now())
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(
+                    self._collect(entry, result), self.timeout.total_seconds()
+                )
+            except asyncio.TimeoutError:
+                _LOGGER.warning("Timeout polling %s", entry.router_id)
+                result.errors["timeout"] = f"No response within {self.timeout.total_seconds()}s"
+            result.duration = time.perf_counter() - start
+            return result
+
+    async def poll_once(self) -> AsyncIterator[FleetResult]:
+        """Polls every router once, yielding results in completion order"""
+
+        tasks = [asyncio.ensure_future(self.poll_router(entry)) for entry in self.entries]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(
+        self, interval: timedelta = SCAN_INTERVAL, jitter: float = DEFAULT_JITTER
+    ) -> AsyncIterator[FleetResult]:
+        """Polls every router forever, each one every `interval` +/- `jitter`.
+
+        Routers start at a random offset within the first interval so the
+        fleet is not polled in lock step.
+        """
+
+        queue: asyncio.Queue[FleetResult] = asyncio.Queue()
+        period = interval.total_seconds()
+
+        async def schedule(entry: RouterEntry) -> None:
+            await asyncio.sleep(random.uniform(0, period))
+            while True:
+                start = time.monotonic()
+                await queue.put(await self.poll_router(entry))
+                delay = period * random.uniform(1 - jitter, 1 + jitter)
+                await asyncio.sleep(max(0.0, delay - (time.monotonic() - start)))
+
+        tasks = [asyncio.ensure_future(schedule(entry)) for entry in self.entries]
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def get_fleet_poller(entries: Iterable[Union[RouterEntry, dict]], **kwargs) -> FleetPoller:
+    return FleetPoller(entries, **kwargs)
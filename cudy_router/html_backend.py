@@ -0,0 +1,212 @@
+"""Pluggable HTML engines used by cudy_parser
+
+The parser only needs a handful of tree operations (find descendants by tag,
+read attributes and text). Each backend implements them on top of one HTML
+library: lxml (C-accelerated) when installed, BeautifulSoup otherwise.
+Neither is imported before the first page is parsed.
+"""
+
+import importlib.util
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, List, Optional
+
+# libxml2 stops at the first </html>, but callers may concatenate several pages
+_DOCUMENT_END = re.compile(r"</(?:body|html)\s*>", re.IGNORECASE)
+
+
+class HtmlBackend(ABC):
+    """Operations the parser needs from an HTML tree
+
+    Engines implement the abstract methods, the selectors are built on them.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def parse(self, input_html: str) -> Any:
+        """Builds the document tree"""
+
+    @abstractmethod
+    def find_all(self, node: Any, tag: str) -> Iterable[Any]:
+        """Descendants of `node` with the given tag, in document order"""
+
+    @abstractmethod
+    def parent(self, node: Any) -> Any:
+        """Parent element of `node`"""
+
+    @abstractmethod
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        """Value of an attribute or None when missing"""
+
+    @abstractmethod
+    def classes(self, node: Any) -> List[str]:
+        """Class names of `node`"""
+
+    @abstractmethod
+    def text(self, node: Any, line_breaks: bool = False) -> str:
+        """Text content of `node`, optionally rendering <br> as new lines"""
+
+    @abstractmethod
+    def tag(self, node: Any) -> str:
+        """Tag name of `node`"""
+
+    def find(self, node: Any, tag: str, element_id: str) -> Any:
+        """First descendant with the given tag and id"""
+
+        for element in self.find_all(node, tag):
+            if self.attr(element, "id") == element_id:
+                return element
+        return None
+
+    def select(self, node: Any, tag: str, class_name: str = None, inside: str = None) -> List[Any]:
+        """Minimal `inside tag.class_name` CSS selector scoped to `node`"""
+
+        selected = []
+        for element in self.find_all(node, tag):
+            if class_name and class_name not in self.classes(element):
+                continue
+            if inside and not self._has_ancestor(element, inside, node):
+                continue
+            selected.append(element)
+        return selected
+
+    def _has_ancestor(self, element: Any, tag: str, root: Any) -> bool:
+        parent = self.parent(element)
+        while parent is not None and parent is not root:
+            if self.tag(parent) == tag:
+                return True
+            parent = self.parent(parent)
+        return False
+
+
+class SoupBackend(HtmlBackend):
+    """Pure python engine based on BeautifulSoup and html.parser"""
+
+    name = "html.parser"
+
+    def __init__(self) -> None:
+        from bs4 import BeautifulSoup  # pylint: disable=import-outside-toplevel
+
+        self._soup = BeautifulSoup
+
+    def parse(self, input_html: str) -> Any:
+        return self._soup(input_html, "html.parser")
+
+    def find_all(self, node: Any, tag: str) -> Iterable[Any]:
+        return node.find_all(tag)
+
+    def parent(self, node: Any) -> Any:
+        return node.parent
+
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        return node.attrs.get(name)
+
+    def classes(self, node: Any) -> List[str]:
+        return node.attrs.get("class", [])
+
+    def text(self, node: Any, line_breaks: bool = False) -> str:
+        if line_breaks:
+            for br_element in node.find_all("br"):
+                br_element.replace_with("\n" + br_element.text)
+        return node.text
+
+    def tag(self, node: Any) -> str:
+        return node.name
+
+
+class LxmlBackend(HtmlBackend):
+    """C-accelerated engine based on lxml.html"""
+
+    name = "lxml"
+
+    def __init__(self) -> None:
+        import lxml.html  # pylint: disable=import-outside-toplevel
+
+        self._html = lxml.html
+
+    def parse(self, input_html: str) -> Any:
+        if not input_html or not input_html.strip():
+            input_html = "<html></html>"
+        input_html = _DOCUMENT_END.sub("", input_html)
+        try:
+            return self._html.document_fromstring(input_html)
+        except ValueError:
+            # Unicode strings with an encoding declaration must be fed as bytes
+            return self._html.document_fromstring(input_html.encode("utf-8"))
+
+    def find_all(self, node: Any, tag: str) -> Iterable[Any]:
+        return node.iterdescendants(tag)
+
+    def parent(self, node: Any) -> Any:
+        return node.getparent()
+
+    def attr(self, node: Any, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def classes(self, node: Any) -> List[str]:
+        return (node.get("class") or "").split()
+
+    def text(self, node: Any, line_breaks: bool = False) -> str:
+        if not line_breaks:
+            return node.text_content()
+        parts: List[str] = []
+        self._collect_text(node, parts)
+        return "".join(parts)
+
+    def _collect_text(self, node: Any, parts: List[str]) -> None:
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            if child.tag == "br":
+                parts.append("\n")
+            elif isinstance(child.tag, str):
+                self._collect_text(child, parts)
+            if child.tail:
+                parts.append(child.tail)
+
+    def tag(self, node: Any) -> str:
+        return node.tag
+
+
+BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+_backend: Optional[HtmlBackend] = None
+
+
+def _has_lxml() -> bool:
+    return importlib.util.find_spec("lxml") is not None
+
+
+class HtmlDocument:
+    """A page parsed once, shared by every extractor run against it"""
+
+    __slots__ = ("backend", "root")
+
+    def __init__(self, input_html: str, backend: HtmlBackend = None) -> None:
+        self.backend = backend or get_backend()
+        self.root = self.backend.parse(input_html)
+
+
+def get_backend() -> HtmlBackend:
+    """Returns the engine used by cudy_parser"""
+
+    return _backend or set_backend()
+
+
+def set_backend(name: str = None) -> HtmlBackend:
+    """Selects the engine used by cudy_parser ("lxml", "html.parser" or None for the fastest available)"""
+
+    global _backend  # pylint: disable=global-statement
+
+    if name is None:
+        name = LxmlBackend.name if _has_lxml() else SoupBackend.name
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML backend {name}, expected one of {', '.join(BACKENDS)}")
+    if name == LxmlBackend.name and not _has_lxml():
+        raise ImportError("lxml is not installed")
+    _backend = BACKENDS[name]()
+    return _backend
@@ -0,0 +1,236 @@
+"""Timing hooks on the hot paths, with an OpenMetrics exporter
+
+Install a `Hooks` subclass with `set_hooks()` to be called back for every
+HTTP request, authentication, `cudy_parser` entry point and model
+validation, and for the retry/re-auth/session refresh/cache counters.
+`MetricsCollector` aggregates them into histograms and counters exported
+in the OpenMetrics text format. Without hooks installed, each instrumented call only pays
+for a None check.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+COUNTERS = ("retries", "reauths", "refreshes", "cache_hits", "cache_misses", "coalesced")
+
+_Function = TypeVar("_Function", bound=Callable[..., Any])
+
+
+class Hooks:
+    """Receives the instrumentation events; every method is a no-op by default
+
+    `router` is the "host:port" of the router, `status` is None when the
+    request failed without response and durations are in seconds.
+    """
+
+    def request(
+        self, router: str, method: str, endpoint: str, status: Optional[int], size: int, duration: float
+    ) -> None:
+        """One HTTP request to a router"""
+
+    def authentication(self, router: str, success: bool, duration: float) -> None:
+        """One login attempt, including its HTTP requests"""
+
+    def parse(self, function: str, duration: float) -> None:
+        """One call to a `cudy_parser` entry point"""
+
+    def validation(self, model: str, duration: float) -> None:
+        """One model built from parsed data"""
+
+    def count(self, name: str, router: str) -> None:
+        """One occurrence of a counted event (see COUNTERS)"""
+
+
+_hooks: Optional[Hooks] = None
+
+
+def get_hooks() -> Optional[Hooks]:
+    """Returns the installed hooks, None when instrumentation is disabled"""
+
+    return _hooks
+
+
+def set_hooks(hooks: Optional[Hooks]) -> Optional[Hooks]:
+    """Installs `hooks` (None disables instrumentation) and returns the previous ones"""
+
+    global _hooks  # pylint: disable=global-statement
+
+    previous, _hooks = _hooks, hooks
+    return previous
+
+
+def timed_parse(function: _Function) -> _Function:
+    """Reports the duration of each call of a parser function to `Hooks.parse`"""
+
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        hooks = _hooks
+        if hooks is None:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            hooks.parse(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...], bound: str = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if bound is not None:
+        pairs.append(f'le="{bound}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsCollector(Hooks):
+    """Aggregates the events into histograms and counters
+
+    Endpoints are reported without their query string to bound the label
+    cardinality (e.g. one `readsms` series for every message).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, prefix: str = "cudy_router") -> None:
+        """Initialize."""
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._histograms: Dict[str, Dict[Tuple, _Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._lock = threading.Lock()
+
+    def _observe(self, metric: str, labels: Tuple, value: float) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(metric, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = _Histogram(len(self.buckets))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def _increment(self, metric: str, labels: Tuple, value: float = 1) -> None:
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def request(
+        self, router: str, method: str, endpoint: str, status: Optional[int], size: int, duration: float
+    ) -> None:
+        labels = (
+            ("router", router),
+            ("method", method),
+            ("endpoint", endpoint.split("?", 1)[0]),
+            ("status", str(status) if status is not None else "error"),
+        )
+        self._observe("http_request_duration_seconds", labels, duration)
+        self._increment("http_response_bytes", (("router", router),), size)
+
+    def authentication(self, router: str, success: bool, duration: float) -> None:
+        self._observe(
+            "authentication_duration_seconds",
+            (("router", router), ("result", "success" if success else "failure")),
+            duration,
+        )
+
+    def parse(self, function: str, duration: float) -> None:
+        self._observe("parse_duration_seconds", (("function", function),), duration)
+
+    def validation(self, model: str, duration: float) -> None:
+        self._observe("validation_duration_seconds", (("model", model),), duration)
+
+    def count(self, name: str, router: str) -> None:
+        self._increment(name, (("router", router),))
+
+    def counter(self, name: str, router: str = None) -> float:
+        """Current value of a counter, summed over routers unless one is given"""
+
+        with self._lock:
+            series = self._counters.get(name, {})
+            return sum(
+                value for labels, value in series.items() if router is None or ("router", router) in labels
+            )
+
+    def histogram(self, metric: str) -> Dict[Tuple, Tuple[int, float]]:
+        """(count, sum) of every series of a histogram, keyed by labels"""
+
+        with self._lock:
+            return {
+                labels: (histogram.count, histogram.sum)
+                for labels, histogram in self._histograms.get(metric, {}).items()
+            }
+
+    def reset(self) -> None:
+        """Drops every recorded value"""
+
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def openmetrics(self) -> str:
+        """Every metric in the OpenMetrics text exposition format"""
+
+        lines: List[str] = []
+        with self._lock:
+            for metric, series in sorted(self._histograms.items()):
+                name = f"{self.prefix}_{metric}"
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels, f'{bound:g}')} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels, '+Inf')} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum!r}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            for metric, series in sorted(self._counters.items()):
+                name = f"{self.prefix}_{metric}"
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}_total{_labels(labels)} {value!r}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(collector: MetricsCollector, port: int = 9100, host: str = "") -> ThreadingHTTPServer:
+    """Serves `collector.openmetrics()` over HTTP from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            body = collector.openmetrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
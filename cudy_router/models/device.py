@@ -1,6 +1,6 @@
 """ Modem Models"""
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel
 
 
@@ -13,6 +13,12 @@ class Device(BaseModel):
     down_speed: float
 
 
+class GroupTotals(BaseModel):
+    device_count: int
+    total_up_speed: float
+    total_down_speed: float
+
+
 class DevicesStats(BaseModel):
     top_downloader_speed: float
     top_downloader_mac: str
@@ -22,9 +28,27 @@ class DevicesStats(BaseModel):
     top_uploader_hostname: str
     total_down_speed: float
     total_up_speed: float
+    top_downloaders: List[Device] = []
+    top_uploaders: List[Device] = []
+    down_speed_percentiles: Dict[str, float] = {}
+    up_speed_percentiles: Dict[str, float] = {}
+    group_totals: Dict[str, GroupTotals] = {}
 
 
 class DevicesInfo(BaseModel):
     device_count: int
     stats: DevicesStats
     devices: List[Device]
+
+
+class DeviceChange(BaseModel):
+    mac: str
+    field: str
+    old: Optional[Union[float, str]] = None
+    new: Optional[Union[float, str]] = None
+
+
+class DevicesDiff(BaseModel):
+    joined: List[Device] = []
+    left: List[Device] = []
+    changed: List[DeviceChange] = []
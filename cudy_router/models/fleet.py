@@ -0,0 +1,31 @@
+""" Fleet Models"""
+
+from datetime import datetime
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+from .device import DevicesInfo
+from .modem import ModemInfo
+from .sms import SMSSummary
+
+
+class RouterEntry(BaseModel):
+    host: str
+    username: str
+    password: str
+    port: int = 80
+    name: Optional[str] = None
+
+    @property
+    def router_id(self) -> str:
+        return self.name or f"{self.host}:{self.port}"
+
+
+class FleetResult(BaseModel):
+    router: str
+    timestamp: datetime
+    duration: float = 0.0
+    modem: Optional[ModemInfo] = None
+    devices: Optional[DevicesInfo] = None
+    sms_summary: Optional[SMSSummary] = None
+    errors: Dict[str, str] = {}
@@ -0,0 +1,135 @@
+""" Lightweight Models
+
+Slotted dataclass counterparts of the pydantic models, generated from the
+pydantic field definitions so both modes share one schema. They are built
+straight from the parser output without validation or coercion, which is
+much cheaper when results are only read once.
+"""
+
+import copy
+import dataclasses
+import time
+import types
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from ..instrumentation import get_hooks
+
+from .device import Device, DevicesInfo, DevicesStats, GroupTotals
+from .modem import Cell, ModemInfo, Network, NetworkAttributes, PartialModemInfo
+from .sms import SMS, SMSSummary
+
+_Builder = List[Tuple[str, Optional[Callable[[Any], Any]], Any]]
+
+_MISSING = object()
+
+_classes: Dict[Type[BaseModel], type] = {}
+_builders: Dict[Type[BaseModel], _Builder] = {}
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) in (Union, types.UnionType):
+        arguments = [argument for argument in get_args(annotation) if argument is not type(None)]
+        if len(arguments) == 1:
+            return arguments[0]
+    return annotation
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """How to turn a raw parser value into the lite value for a field, None to keep it"""
+
+    annotation = _unwrap_optional(annotation)
+    if _is_model(annotation):
+        return lambda value: to_lite(annotation, value)
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        (item,) = get_args(annotation) or (Any,)
+        item = _unwrap_optional(item)
+        if _is_model(item):
+            return lambda value: [to_lite(item, entry) for entry in value]
+        return list
+    if origin in (dict, Dict):
+        _, item = get_args(annotation) or (Any, Any)
+        item = _unwrap_optional(item)
+        if _is_model(item):
+            return lambda value: {key: to_lite(item, entry) for key, entry in value.items()}
+    return None
+
+
+def lite_class(model: Type[BaseModel]) -> type:
+    """Returns the slotted dataclass mirroring a pydantic model"""
+
+    lite = _classes.get(model)
+    if lite is None:
+        lite = dataclasses.make_dataclass(
+            model.__name__,
+            [
+                (name, field.annotation, dataclasses.field(default=None))
+                for name, field in model.model_fields.items()
+            ],
+            slots=True,
+        )
+        lite.__module__ = __name__
+        _classes[model] = lite
+    return lite
+
+
+def _builder(model: Type[BaseModel]) -> _Builder:
+    builder = _builders.get(model)
+    if builder is None:
+        builder = [
+            (
+                name,
+                _converter(field.annotation),
+                None if field.is_required() else field.get_default(call_default_factory=True),
+            )
+            for name, field in model.model_fields.items()
+        ]
+        _builders[model] = builder
+    return builder
+
+
+def to_lite(model: Type[BaseModel], data: Any) -> Any:
+    """Builds the lite counterpart of `model` from raw parser data"""
+
+    if data is None:
+        return None
+    values = {}
+    for name, convert, default in _builder(model):
+        value = data.get(name, _MISSING)
+        if value is _MISSING:
+            # Mutable defaults (e.g. []) must not be shared between objects
+            value = copy.copy(default)
+        values[name] = convert(value) if convert and value is not None else value
+    return lite_class(model)(**values)
+
+
+def build_model(model: Type[BaseModel], data: Any, lite: bool = False) -> Any:
+    """Validates `data` as a pydantic `model`, or builds its lite counterpart"""
+
+    hooks = get_hooks()
+    if hooks is None:
+        return to_lite(model, data) if lite else model.model_validate(data)
+    start = time.perf_counter()
+    try:
+        return to_lite(model, data) if lite else model.model_validate(data)
+    finally:
+        hooks.validation(model.__name__, time.perf_counter() - start)
+
+
+LiteNetworkAttributes = lite_class(NetworkAttributes)
+LiteNetwork = lite_class(Network)
+LiteCell = lite_class(Cell)
+LiteModemInfo = lite_class(ModemInfo)
+LitePartialModemInfo = lite_class(PartialModemInfo)
+LiteDevice = lite_class(Device)
+LiteGroupTotals = lite_class(GroupTotals)
+LiteDevicesStats = lite_class(DevicesStats)
+LiteDevicesInfo = lite_class(DevicesInfo)
+LiteSMSSummary = lite_class(SMSSummary)
+LiteSMS = lite_class(SMS)
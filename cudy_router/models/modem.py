@@ -1,6 +1,6 @@
 """ Modem Models"""
 
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -30,3 +30,15 @@ class ModemInfo(BaseModel):
     sim: int
     band: List[str]
     cell: Cell
+
+class PartialModemInfo(BaseModel):
+    network: Optional[Network] = None
+    connected_time: Optional[int] = None
+    signal: Optional[int] = None
+    rssi: Optional[int] = None
+    rsrp: Optional[int] = None
+    rsrq: Optional[int] = None
+    sinr: Optional[int] = None
+    sim: Optional[int] = None
+    band: Optional[List[str]] = None
+    cell: Optional[Cell] = None
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -15,3 +16,17 @@ class SMS(BaseModel):
     cfg: str | None = None
     timestamp: datetime | None = None
     box: str | None = None
+
+
+class SMSReadResult(BaseModel):
+    cfg: str | None = None
+    sms: Optional[SMS] = None
+    error: Optional[str] = None
+
+
+class SMSDelta(BaseModel):
+    box: str
+    new: List[SMS] = []
+    removed: List[SMS] = []
+    skipped: bool = False
+    errors: Dict[str, str] = {}
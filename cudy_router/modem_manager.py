@@ -1,24 +1,160 @@
 """Modem Manager"""
 
+import logging
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
+
 from . import CudyRouter
 from . import cudy_parser
-from .models.modem import ModemInfo
+from .cache import DEFAULT_MEMO_SIZE, ResultMemo
+from .models.lite import build_model
+from .models.modem import ModemInfo, PartialModemInfo
+
+if TYPE_CHECKING:
+    from .async_router import AsyncCudyRouter
+
+_LOGGER = logging.getLogger(__name__)
+
+STATUS_URL = "admin/network/gcom/status"
+STATUS_DETAIL_URL = "admin/network/gcom/status?detail=1"
+STATUS_URLS = (STATUS_URL, STATUS_DETAIL_URL)
+
+# Status page(s) carrying each ModemInfo field
+MODEM_FIELD_URLS = {
+    "network": (STATUS_URL, STATUS_DETAIL_URL),
+    "connected_time": (STATUS_URL,),
+    "sim": (STATUS_URL,),
+    "signal": (STATUS_DETAIL_URL,),
+    "rssi": (STATUS_DETAIL_URL,),
+    "rsrp": (STATUS_DETAIL_URL,),
+    "rsrq": (STATUS_DETAIL_URL,),
+    "sinr": (STATUS_DETAIL_URL,),
+    "band": (STATUS_DETAIL_URL,),
+    "cell": (STATUS_DETAIL_URL,),
+}
 
 
 class ModemManager:
-    def __init__(self, cudy_router):
-        """Initialize."""
+    def __init__(self, cudy_router, memo_size: int = DEFAULT_MEMO_SIZE, lite: bool = False):
+        """Initialize.
+
+        Results are memoized on the content of the fetched pages, keeping
+        up to `memo_size` of them (0 disables it). With `lite`, results are
+        slotted dataclasses built without pydantic validation.
+        """
         self.cudy_router = cudy_router
+        self.lite = lite
+        self._memo = ResultMemo(memo_size)
+
+    def  get_modem_info(
+        self, fields: Optional[Iterable[str]] = None
+    ) -> Union[ModemInfo, PartialModemInfo]:
+        """Retrieves Modem infos from the router
+
+        When `fields` names a subset of the ModemInfo fields (e.g. "rssi",
+        "rsrp", "sinr"), only the status page(s) carrying them are fetched
+        and a PartialModemInfo is returned. When both pages are needed they
+        are fetched concurrently. A requested field left empty by the page(s)
+        of MODEM_FIELD_URLS is looked for in the other page too.
+        """
+
+        fields = self._fields(fields)
+        pages = self._fetch(self._urls(fields))
+        modem_info = self._modem_info(pages, fields)
+        if missing := self._missing_urls(modem_info, fields, pages):
+            pages.update(self._fetch(missing))
+            modem_info = self._modem_info(pages, fields)
+        return modem_info
+
+    def _fetch(self, urls: List[str]) -> Dict[str, str]:
+        """Pages of `urls`, the second one fetched by a thread of the router"""
+
+        if len(urls) < 2:
+            return {url: self.cudy_router.get(url) for url in urls}
+        detail = self.cudy_router.submit_get(urls[1])
+        return {urls[0]: self.cudy_router.get(urls[0]), urls[1]: detail.result()}
+
+    @staticmethod
+    def _fields(fields: Optional[Iterable[str]]) -> Optional[List[str]]:
+        """Validates the requested fields"""
+
+        if fields is None:
+            return None
+        fields = list(fields)
+        unknown = set(fields) - set(MODEM_FIELD_URLS)
+        if unknown:
+            raise ValueError(f"Unknown modem fields: {', '.join(sorted(unknown))}")
+        return fields
+
+    @staticmethod
+    def _urls(fields: Optional[List[str]]) -> List[str]:
+        """Status pages to fetch for the requested fields"""
 
-    def  get_modem_info(self) -> ModemInfo:
-        """Retrieves Modem infos from the router"""
+        if fields is None:
+            return list(STATUS_URLS)
+        needed = {url for field in fields for url in MODEM_FIELD_URLS[field]}
+        return [url for url in STATUS_URLS if url in needed]
 
-        modem_info = cudy_parser.get_modem_info(
-            f"{self.cudy_router.get('admin/network/gcom/status')}{self.cudy_router.get('admin/network/gcom/status?detail=1')}"
-        )
-        return ModemInfo.model_validate(modem_info)
+    @staticmethod
+    def _missing_urls(
+        modem_info: Union[ModemInfo, PartialModemInfo], fields: Optional[List[str]], pages: Dict[str, str]
+    ) -> List[str]:
+        """Status pages not fetched yet when a requested field is still empty
+
+        MODEM_FIELD_URLS comes from a few firmware versions: when another one
+        shows a field on the other page, it is still found, for one more
+        request (the cost of fetching every page).
+        """
+
+        if fields is None or all(getattr(modem_info, field) is not None for field in fields):
+            return []
+        missing = [url for url in STATUS_URLS if url not in pages]
+        if missing:
+            _LOGGER.debug("Modem fields %s not found in %s, fetching %s", fields, list(pages), missing)
+        return missing
+
+    def _modem_info(
+        self, pages: Dict[str, str], fields: Optional[List[str]] = None
+    ) -> Union[ModemInfo, PartialModemInfo]:
+        """Parses and validates the modem status pages"""
+
+        # Always parsed in the same order, whichever were fetched first
+        pages = [pages[url] for url in STATUS_URLS if url in pages]
+
+        def build() -> Union[ModemInfo, PartialModemInfo]:
+            modem_info = cudy_parser.get_modem_info("".join(pages))
+            if fields is None:
+                return build_model(ModemInfo, modem_info, self.lite)
+            return build_model(PartialModemInfo, {field: modem_info[field] for field in fields}, self.lite)
+
+        return self._memo.get_or_build(["modem", repr(fields), *pages], build)
+
+
+class AsyncModemManager(ModemManager):
+    """asyncio counterpart of `ModemManager` working with an `AsyncCudyRouter`"""
+
+    async def get_modem_info(
+        self, fields: Optional[Iterable[str]] = None
+    ) -> Union[ModemInfo, PartialModemInfo]:
+        """Retrieves Modem infos from the router, parsed off the event loop"""
+
+        # Already loaded by the running event loop, only deferred for sync users
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        async def fetch(urls: List[str]) -> Dict[str, str]:
+            return dict(zip(urls, await asyncio.gather(*(self.cudy_router.get(url) for url in urls))))
+
+        fields = self._fields(fields)
+        pages = await fetch(self._urls(fields))
+        modem_info = await self.cudy_router.parse(self._modem_info, pages, fields)
+        if missing := self._missing_urls(modem_info, fields, pages):
+            pages.update(await fetch(missing))
+            modem_info = await self.cudy_router.parse(self._modem_info, pages, fields)
+        return modem_info
 
 
 def get_modem_manager(cudy_router: CudyRouter) -> ModemManager:
     return ModemManager(cudy_router)
 
+
+def get_async_modem_manager(cudy_router: "AsyncCudyRouter") -> AsyncModemManager:
+    return AsyncModemManager(cudy_router)
@@ -0,0 +1,119 @@
+"""Value parsers and statistics helpers on the hot paths of cudy_parser
+
+They run once per table cell, device or message, so patterns are compiled
+at import, units are looked up in tables and the timestamps in the format
+used by the routers are read without going through dateutil.
+"""
+
+import re
+from datetime import datetime
+
+BAND = re.compile(r".*BAND\s*(?P<band>\d+)\s*/\s*(?P<bandwidth>\d+)\s*MHz")
+QUOTED = re.compile(r"['\"]([^'\"]+)['\"]")
+SMS_CFG = re.compile(r"cfg=([a-z0-9]+)")
+
+# Multipliers to megabits per second, by lower case unit. They are powers
+# of two so the conversion is exact; slow units are rounded to 2 decimals
+_SPEED_UNITS = {
+    "bps": (1 / 1024 / 1024, True),
+    "kbps": (1 / 1024, True),
+    "mbps": (1.0, False),
+    "gbps": (1024.0, False),
+}
+
+# Seconds in the fixed length units of a duration. Years and months depend
+# on the calendar and are left to dateutil
+_DURATION_UNITS = (("week", 7 * 24 * 3600), ("day", 24 * 3600))
+_CALENDAR_UNITS = ("year", "month")
+
+
+def band(raw_band_info: str | None) -> str | None:
+    """Band name ("B3") of a "BAND 3 / 20 MHz" carrier description"""
+
+    if raw_band_info:
+        match = BAND.match(raw_band_info)
+        if match:
+            return f"B{match.group('band')}"
+    return None
+
+
+def speed(input_string: str | None) -> float | None:
+    """Transfer speed such as "12.5 Kbps" in megabits per second"""
+
+    if not input_string:
+        return None
+    value, _, unit = input_string.partition(" ")
+    conversion = _SPEED_UNITS.get(unit.lower()) or _SPEED_UNITS.get(unit[unit.rfind(" ") + 1:].lower())
+    if conversion is None:
+        return 0
+    factor, rounded = conversion
+    return round(float(value) * factor, 2) if rounded else float(value) * factor
+
+
+def seconds_duration(raw_duration: str | None) -> int | None:
+    """Duration such as "2 days 03:04:05" in seconds"""
+
+    if not raw_duration:
+        return None
+    parts = raw_duration.lower().split()
+    seconds = 0
+    for i, part in enumerate(parts):
+        if part.count(":") == 2:
+            hours, minutes, secs = part.split(":")
+            seconds += int(hours) * 3600 + int(minutes) * 60 + int(secs)
+        elif i == 0:
+            continue
+        elif part.startswith(_CALENDAR_UNITS):
+            return _calendar_duration(parts)
+        else:
+            for unit, unit_seconds in _DURATION_UNITS:
+                if part.startswith(unit):
+                    seconds += int(parts[i - 1]) * unit_seconds
+                    break
+    return seconds
+
+
+def _calendar_duration(parts: list[str]) -> int:
+    """Slow path of `seconds_duration` for durations counted in months or years"""
+
+    from dateutil.relativedelta import relativedelta  # pylint: disable=import-outside-toplevel
+
+    duration = relativedelta()
+    for i, part in enumerate(parts):
+        if part.count(":") == 2:
+            hours, minutes, seconds = part.split(":")
+            duration += relativedelta(hours=int(hours), minutes=int(minutes), seconds=int(seconds))
+        elif i == 0:
+            continue
+        elif part.startswith("year"):
+            duration += relativedelta(years=int(parts[i - 1]))
+        elif part.startswith("month"):
+            duration += relativedelta(months=int(parts[i - 1]))
+        elif part.startswith("week"):
+            duration += relativedelta(weeks=int(parts[i - 1]))
+        elif part.startswith("day"):
+            duration += relativedelta(days=int(parts[i - 1]))
+
+    # Get absolute duration from relative duration (considering different month lengths)
+    now = datetime.now()
+    return int((now - (now - duration)).total_seconds())
+
+
+def parse_timestamp(raw_timestamp: str) -> datetime:
+    """Date and time of a message, "2024-03-01 12:00:05" as shown by the routers"""
+
+    try:
+        return datetime.fromisoformat(raw_timestamp)
+    except ValueError:
+        from dateutil.parser import parse  # pylint: disable=import-outside-toplevel
+
+        return parse(raw_timestamp)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Percentile of sorted values, by linear interpolation between closest ranks (NumPy's default method)"""
+
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
@@ -0,0 +1,285 @@
+"""Compact time-series recording of modem and device metrics
+
+Each poll is appended to fixed-size ring buffers backed by `array` storage
+(one timestamp column shared by several float32 value columns), so a day of
+history costs a few bytes per sample instead of one pydantic object per
+poll. NumPy is used for vectorized export and aggregates when installed,
+imported on first use.
+"""
+
+import functools
+import math
+import time
+from array import array
+from collections import OrderedDict
+from datetime import timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from .models.device import DevicesInfo
+from .models.modem import ModemInfo
+from .primitives import percentile
+
+# One sample every 15 s for a day, about 280 KB for the modem and device totals
+DEFAULT_CAPACITY = 5760
+# One sample every 15 s for 6 hours, 16 bytes each: about 23 KB per device
+DEFAULT_DEVICE_CAPACITY = 1440
+# Devices with a buffer, the least recently seen are dropped beyond this:
+# at most about 6 MB of per-device history per router with the defaults
+DEFAULT_MAX_DEVICES = 256
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+MODEM_METRICS = ("rssi", "rsrp", "rsrq", "sinr", "signal")
+DEVICES_METRICS = ("device_count", "total_up_speed", "total_down_speed")
+DEVICE_METRICS = ("up_speed", "down_speed")
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """The numpy module, None when not installed"""
+
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    return numpy
+
+
+class RingBuffer:
+    """Fixed-size ring of samples: a timestamp plus one value per column
+
+    Appending is O(1); once full, the oldest sample is overwritten. Missing
+    values are stored as NaN and ignored by aggregates.
+    """
+
+    __slots__ = ("capacity", "columns", "_times", "_values", "_start", "_size")
+
+    def __init__(self, capacity: int, columns: Sequence[str], typecode: str = "f") -> None:
+        """Initialize."""
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self._times = array("d", bytes(8 * capacity))
+        self._values = {
+            column: array(typecode, [math.nan]) * capacity for column in self.columns
+        }
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: Sequence[Optional[float]]) -> None:
+        """Appends one sample, `values` being in column order"""
+
+        if self._size < self.capacity:
+            position = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            position = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._times[position] = timestamp
+        for column, value in zip(self.columns, values):
+            self._values[column][position] = math.nan if value is None else value
+
+    def _ordered(self, data: array) -> array:
+        end = self._start + self._size
+        if end <= self.capacity:
+            return data[self._start:end]
+        return data[self._start:] + data[:end - self.capacity]
+
+    def _first_since(self, since: Optional[float]) -> int:
+        """Index (in logical order) of the first sample at or after `since`"""
+
+        if since is None:
+            return 0
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._times[(self._start + middle) % self.capacity] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def timestamps(self, since: float = None) -> array:
+        """Sample timestamps, oldest first"""
+
+        return self._ordered(self._times)[self._first_since(since):]
+
+    def column(self, name: str, since: float = None) -> array:
+        """Values of one column, oldest first"""
+
+        return self._ordered(self._values[name])[self._first_since(since):]
+
+    def stats(
+        self, name: str, since: float = None, percentiles: Sequence[float] = DEFAULT_PERCENTILES
+    ) -> Dict[str, Optional[float]]:
+        """min/max/mean/count and percentiles of a column over a window"""
+
+        values = self.column(name, since)
+        if (np := _numpy()) is not None:
+            data = np.frombuffer(values, dtype=np.float32 if values.typecode == "f" else np.float64)
+            data = data[~np.isnan(data)]
+            if not data.size:
+                return self._empty_stats(percentiles)
+            result = {
+                "count": int(data.size),
+                "min": float(data.min()),
+                "max": float(data.max()),
+                "mean": float(data.mean(dtype=np.float64)),
+            }
+            for percent, value in zip(percentiles, np.percentile(data, percentiles)):
+                result[f"p{percent:g}"] = float(value)
+            return result
+
+        data = sorted(value for value in values if not math.isnan(value))
+        if not data:
+            return self._empty_stats(percentiles)
+        result = {
+            "count": len(data),
+            "min": data[0],
+            "max": data[-1],
+            "mean": math.fsum(data) / len(data),
+        }
+        for percent in percentiles:
+            result[f"p{percent:g}"] = percentile(data, percent)
+        return result
+
+    @staticmethod
+    def _empty_stats(percentiles: Sequence[float]) -> Dict[str, Optional[float]]:
+        result = {"count": 0, "min": None, "max": None, "mean": None}
+        result.update({f"p{percentile:g}": None for percentile in percentiles})
+        return result
+
+    def to_numpy(self, since: float = None) -> Dict[str, "np.ndarray"]:
+        """Vectorized export: one array per column plus "timestamp" """
+
+        if (np := _numpy()) is None:
+            raise ImportError("numpy is not installed")
+        first = self._first_since(since)
+        exported = {"timestamp": np.asarray(self._ordered(self._times)[first:])}
+        for column in self.columns:
+            exported[column] = np.asarray(self._ordered(self._values[column])[first:])
+        return exported
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the sample storage"""
+
+        return sum(
+            values.itemsize * len(values) for values in (self._times, *self._values.values())
+        )
+
+
+class MetricsRecorder:
+    """Records each poll of a router into ring buffers
+
+    Modem metrics and device totals get one buffer each; per-device speeds
+    get one buffer per MAC address, created on first sight. At most
+    `max_devices` device buffers are kept (None for no limit): with
+    randomized client MAC addresses, the device seen least recently is
+    dropped to make room for a new one. Keep it above the number of
+    clients connected at once.
+
+    A sample takes 8 bytes for its timestamp plus 4 per metric, so device
+    buffers take up to `max_devices * device_capacity * 16` bytes (see
+    `nbytes`).
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        device_capacity: int = DEFAULT_DEVICE_CAPACITY,
+        max_devices: Optional[int] = DEFAULT_MAX_DEVICES,
+    ) -> None:
+        """Initialize."""
+        self.modem = RingBuffer(capacity, MODEM_METRICS)
+        self.devices = RingBuffer(capacity, DEVICES_METRICS)
+        self.device_capacity = device_capacity
+        self.max_devices = max_devices
+        # Least recently seen first
+        self._devices: "OrderedDict[str, RingBuffer]" = OrderedDict()
+
+    def record_modem(self, modem_info: ModemInfo, timestamp: float = None) -> None:
+        """Appends the signal metrics of a modem poll"""
+
+        self.modem.append(
+            time.time() if timestamp is None else timestamp,
+            [getattr(modem_info, metric) for metric in MODEM_METRICS],
+        )
+
+    def record_devices(self, devices_info: DevicesInfo, timestamp: float = None) -> None:
+        """Appends the totals and per-MAC speeds of a devices poll"""
+
+        timestamp = time.time() if timestamp is None else timestamp
+        self.devices.append(timestamp, [
+            devices_info.device_count,
+            devices_info.stats.total_up_speed,
+            devices_info.stats.total_down_speed,
+        ])
+        for device in devices_info.devices:
+            buffer = self._devices.get(device.mac)
+            if buffer is None:
+                buffer = self._devices[device.mac] = RingBuffer(self.device_capacity, DEVICE_METRICS)
+            else:
+                self._devices.move_to_end(device.mac)
+            buffer.append(timestamp, [device.up_speed, device.down_speed])
+        if self.max_devices is not None:
+            while len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+
+    def device(self, mac: str) -> Optional[RingBuffer]:
+        """Per-device buffer, None for an unknown MAC"""
+
+        return self._devices.get(mac)
+
+    def macs(self) -> List[str]:
+        """MAC addresses with a buffer, least recently seen first"""
+
+        return list(self._devices)
+
+    def _buffer(self, metric: str, mac: str = None) -> RingBuffer:
+        if mac is not None:
+            if mac not in self._devices:
+                raise KeyError(f"Unknown device {mac}")
+            return self._devices[mac]
+        if metric in MODEM_METRICS:
+            return self.modem
+        if metric in DEVICES_METRICS:
+            return self.devices
+        raise KeyError(f"Unknown metric {metric}")
+
+    def series(
+        self, metric: str, mac: str = None, window: timedelta = None
+    ) -> Tuple[array, array]:
+        """(timestamps, values) of a metric, optionally for one MAC and over a window"""
+
+        buffer = self._buffer(metric, mac)
+        since = time.time() - window.total_seconds() if window else None
+        return buffer.timestamps(since), buffer.column(metric, since)
+
+    def stats(
+        self,
+        metric: str,
+        mac: str = None,
+        window: timedelta = None,
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    ) -> Dict[str, Optional[float]]:
+        """Windowed aggregates of a metric, optionally for one MAC"""
+
+        since = time.time() - window.total_seconds() if window else None
+        return self._buffer(metric, mac).stats(metric, since, percentiles)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by every buffer of this recorder"""
+
+        return self.modem.nbytes + self.devices.nbytes + sum(
+            buffer.nbytes for buffer in self._devices.values()
+        )
+
+
+def get_metrics_recorder(**kwargs) -> MetricsRecorder:
+    return MetricsRecorder(**kwargs)
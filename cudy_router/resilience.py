@@ -0,0 +1,138 @@
+"""Request policy of the routers: timeouts, retries with backoff and circuit breaking"""
+
+import random
+import threading
+import time
+from datetime import timedelta
+
+from .exceptions import CircuitOpenError
+
+RETRY_INTERVAL = timedelta(seconds=300)
+
+DEFAULT_CONNECT_TIMEOUT = timedelta(seconds=5)
+DEFAULT_READ_TIMEOUT = timedelta(seconds=30)
+DEFAULT_ATTEMPTS = 3
+DEFAULT_BACKOFF = timedelta(seconds=0.5)
+DEFAULT_MAX_BACKOFF = timedelta(seconds=5)
+DEFAULT_FAILURE_THRESHOLD = 3
+
+
+class RequestPolicy:
+    """How hard a router is tried before giving up
+
+    A request is attempted up to `attempts` times when the router cannot be
+    reached or answers with a 5xx status, waiting an exponentially growing
+    random delay (full jitter, from `backoff` up to `max_backoff`) between
+    attempts. After `failure_threshold` consecutive failed requests, the
+    router is not queried for `retry_interval`.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: timedelta = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: timedelta = DEFAULT_READ_TIMEOUT,
+        attempts: int = DEFAULT_ATTEMPTS,
+        backoff: timedelta = DEFAULT_BACKOFF,
+        max_backoff: timedelta = DEFAULT_MAX_BACKOFF,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        retry_interval: timedelta = RETRY_INTERVAL,
+    ) -> None:
+        """Initialize."""
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        """(connect, read) timeouts in seconds"""
+
+        return self.connect_timeout.total_seconds(), self.read_timeout.total_seconds()
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retrying after the `attempt`-th failure"""
+
+        ceiling = min(
+            self.max_backoff.total_seconds(), self.backoff.total_seconds() * 2 ** (attempt - 1)
+        )
+        return random.uniform(0, ceiling)
+
+    def circuit_breaker(self) -> "CircuitBreaker":
+        """A breaker applying this policy"""
+
+        return CircuitBreaker(self.failure_threshold, self.retry_interval)
+
+
+class CircuitBreaker:
+    """Stops querying a router after consecutive failures
+
+    Once `failure_threshold` requests failed in a row the circuit opens:
+    requests fail at once with `CircuitOpenError` for `retry_interval`.
+    Then a single trial request goes through; it closes the circuit if it
+    succeeds and reopens it otherwise. A threshold of 0 disables breaking.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, retry_interval: timedelta = RETRY_INTERVAL) -> None:
+        """Initialize."""
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self.failures = 0
+        self._state = self.CLOSED
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """CLOSED, OPEN or HALF_OPEN (trial due or in flight)"""
+
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() >= self._retry_at:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self, router: str) -> None:
+        """Raises CircuitOpenError unless a request to `router` may be sent now"""
+
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and time.monotonic() >= self._retry_at:
+                self._state = self.HALF_OPEN
+                return
+            raise CircuitOpenError(router, self._retry_at)
+
+    def record_success(self) -> None:
+        """The router answered"""
+
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+
+    def release(self) -> None:
+        """The call let through ended without telling whether the router works
+
+        An abandoned trial (cancelled, interrupted) is due again, so the next
+        call makes it instead of the circuit staying half-open.
+        """
+
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+
+    def record_failure(self) -> None:
+        """The router could not be queried, even after retries"""
+
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or (
+                self.failure_threshold and self.failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._retry_at = time.monotonic() + self.retry_interval.total_seconds()
@@ -1,41 +1,156 @@
 """Provides the backend for a Cudy router"""
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import timedelta
+from typing import Callable
 import time
 import math
 import logging
-import urllib.parse
-from http.cookies import SimpleCookie
-from hashlib import sha256
+import threading
+import warnings
 import requests
-import tzlocal
+from requests.adapters import HTTPAdapter
 
 from . import cudy_parser
+from .cache import DEFAULT_CACHE_SIZE, ResponseCache
+from .exceptions import (
+    AuthenticationError,
+    CircuitOpenError,
+    RouterConnectionError,
+    RouterHTTPError,
+    RouterTimeoutError,
+)
+from .instrumentation import get_hooks
+from .resilience import RequestPolicy
+from .router_base import RouterBase
 
 _LOGGER = logging.getLogger(__name__)
 
 MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=15)
 SCAN_INTERVAL = timedelta(seconds=30)
-RETRY_INTERVAL = timedelta(seconds=300)
 
+DEFAULT_POOL_CONNECTIONS = 1
+DEFAULT_POOL_MAXSIZE = 4
 
-class CudyRouter:
+# LuCI `sessiontime`: sessions expire after this long without a request
+DEFAULT_SESSION_TIMEOUT = timedelta(hours=1)
+# How long before that timeout the session is proactively renewed
+DEFAULT_SESSION_MARGIN = timedelta(seconds=30)
+
+# Endpoints whose pages are served from cache, and for how long
+DEFAULT_CACHE_POLICIES = {
+    "admin/network/gcom/status": MIN_TIME_BETWEEN_UPDATES,
+    "admin/network/devices/devlist": MIN_TIME_BETWEEN_UPDATES,
+    "admin/network/gcom/sms/status": MIN_TIME_BETWEEN_UPDATES,
+}
+
+
+def __getattr__(name: str):
+    # RETRY_INTERVAL moved to resilience, still importable from here for now
+    if name == "RETRY_INTERVAL":
+        warnings.warn(
+            "cudy_router.router.RETRY_INTERVAL is deprecated, use cudy_router.resilience.RETRY_INTERVAL",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        from .resilience import RETRY_INTERVAL  # pylint: disable=import-outside-toplevel
+
+        return RETRY_INTERVAL
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class CudyRouter(RouterBase):
     """Represents a router and provides functions for communication."""
 
     def __init__(
         self, host: str, username: str, password: str, port: int = 80,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        cache_policies: dict[str, timedelta] | None = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        session_timeout: timedelta | None = DEFAULT_SESSION_TIMEOUT,
+        session_margin: timedelta = DEFAULT_SESSION_MARGIN,
+        policy: RequestPolicy | None = None,
     ) -> None:
-        """Initialize."""
+        """Initialize.
+
+        The router owns a keep-alive `requests.Session` so successive calls
+        reuse the same TCP connection(s) to the LuCI server. `pool_maxsize`
+        bounds the number of connections kept open to this router.
+
+        `get()` serves the endpoints listed in `cache_policies` (defaults to
+        DEFAULT_CACHE_POLICIES, `{}` disables caching) from an LRU cache of
+        `cache_size` pages.
+
+        The session is renewed `session_margin` before the router idle
+        timeout `session_timeout` (None to only renew it on a 403), and
+        concurrent callers needing a new session share a single login.
+
+        `policy` sets the timeouts, the retries of failed requests and when
+        the router is given up on for a while (see RequestPolicy).
+
+        `submit_get()` fetches pages in the background on up to
+        `pool_maxsize` threads of this router, one per pooled connection.
+        """
         self.host = host
         self.port = port
         self.url = f"http://{self.host}:{self.port}/cgi-bin/luci"
-        self.auth_cookie = None
         self.username = username
         self.password = password
+        self.token = None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache = ResponseCache(
+            DEFAULT_CACHE_POLICIES if cache_policies is None else cache_policies, cache_size
+        )
+        self.session_timeout = session_timeout
+        self.session_margin = session_margin
+        self._session_used: float | None = None
+        self._auth_lock = threading.Lock()
+        self.policy = policy or RequestPolicy()
+        self.breaker = self.policy.circuit_breaker()
+        self._inflight: dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._pool_maxsize = pool_maxsize
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    def __enter__(self) -> "CudyRouter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the pooled connections to the router and stops its fetch threads."""
+
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            # A fetch hung on the router ends with its timeout, not waited for here
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    @property
+    def auth_cookie(self) -> str | None:
+        """Returns the current `sysauth` session cookie, if any."""
+
+        return self.session.cookies.get("sysauth")
 
     def get_cookie_header(self, force_auth: bool) -> str:
-        """Returns a cookie header that should be used for authentication."""
+        """Returns a cookie header that should be used for authentication.
+
+        Deprecated: requests carry the session cookie of `self.session` and
+        log in as needed, use `authenticate()` to force a login.
+        """
 
+        warnings.warn(
+            "CudyRouter.get_cookie_header is deprecated, the session sends the cookie itself",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         if not force_auth and self.auth_cookie:
             return f"sysauth={self.auth_cookie}"
         if self.authenticate():
@@ -43,7 +158,24 @@ class CudyRouter:
         else:
             return ""
 
-    def authenticate(self) -> bool:
+    def _ensure_authenticated(self) -> bool:
+        """Logs in if there is no session yet or if it is about to expire."""
+
+        if not self._session_stale():
+            return True
+        if cookie := self.auth_cookie:
+            self._count("refreshes")
+        return self._reauthenticate(cookie)
+
+    def _reauthenticate(self, stale_cookie: str | None, login_page: str = None) -> bool:
+        """Replaces the `stale_cookie` session unless another caller already did"""
+
+        with self._auth_lock:
+            if self.auth_cookie and self.auth_cookie != stale_cookie:
+                return True
+            return self._login(login_page)
+
+    def authenticate(self, login_page: str = None) -> bool:
         """ Test if we can authenticate with the host.
             Extract from Cudy/Luci javascript code:
             $("form").submit(function(e){
@@ -59,110 +191,226 @@ class CudyRouter:
                     $("input[name='luci_password']").val($('#luci_password2').val());
                 }
             });
-        """
 
-        headers = {"Content-Type": "application/x-www-form-urlencoded", "Cookie": ""}
+            `login_page` is the body of a 403 answer, when known: its login
+            form is tried first, saving the fetch of a fresh one.
+
+            Returns False without any request while the circuit is open.
+        """
 
         try:
-            response = requests.get(self.url, timeout=30, allow_redirects=False)
-            if response.status_code == 403 and (data := cudy_parser.get_login_info(response.text)):
-                encrypted_password = self._encrypt_password(self.password, data['token'], data['salt'])
-                params_list = [
-                    f"zonename={tzlocal.get_localzone_name()}",
-                    f"timeclock={int(math.floor(time.time()/1000))}",
-                    f"luci_username={urllib.parse.quote(self.username)}",
-                    f"luci_password={urllib.parse.quote(encrypted_password)}",
-                    "luci_language=en"
-                ]
-                if data.get('_csrf'):
-                    params_list.append(f"_csrf={data['_csrf']}")
-                self.token = data.get('token')
-                if self.token:
-                    params_list.append(f"token={data['token']}")
-                if data.get('salt'):
-                    params_list.append(f"salt={data['salt']}")
-                response = requests.post(self.url, timeout=30, headers=headers, data="&".join(params_list), allow_redirects=False)
-            else:
-                return False
-        except requests.exceptions.ConnectionError:
-            _LOGGER.debug("Connection error?")
+            self.breaker.before_call(self._address)
+        except CircuitOpenError as err:
+            _LOGGER.debug("%s", err)
             return False
-
-        if not response.ok:
+        try:
+            with self._auth_lock:
+                success = self._login(login_page)
+        except requests.exceptions.RequestException as err:
+            self.breaker.record_failure()
+            _LOGGER.debug("Login to %s failed: %s", self._address, err)
             return False
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return success
 
-        cookie = SimpleCookie()
-        cookie.load(response.headers.get("set-cookie"))
-        self.auth_cookie = cookie.get("sysauth").value
+    def _login(self, login_page: str = None) -> bool:
+        hooks = get_hooks()
+        if hooks is None:
+            return self._authenticate(login_page)
+        start = time.perf_counter()
+        success = False
+        try:
+            success = self._authenticate(login_page)
+            return success
+        finally:
+            hooks.authentication(self._address, success, time.perf_counter() - start)
+
+    def _authenticate(self, login_page: str = None) -> bool:
+        # The 403 answer to an expired session carries a usable login form
+        if (data := self._login_info(login_page)) and self._post_login(data):
+            return True
+
+        # Otherwise the login page must be requested anonymously
+        self.session.cookies.clear()
+        response = self._request("GET", "")
+        if response.status_code == 403 and (data := cudy_parser.get_login_info(response.text)):
+            return self._post_login(data)
+        return False
+
+    def _post_login(self, data: dict[str, str]) -> bool:
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+        self.session.cookies.clear()
+        self.token = data.get('token')
+        response = self._request("POST", "", headers=headers, data=self._login_form(data))
+        # The session cookie jar picked up `sysauth` from the login response
+        if not response.ok or self.auth_cookie is None:
+            return False
+        self._session_used = time.monotonic()
         return True
 
-    @staticmethod
-    def _encrypt_password(clear_password: str, token: str, salt: str) -> str:
-        encrypted_password = clear_password
-        if salt:
-            encrypted_password = sha256((clear_password + salt).encode("utf-8")).hexdigest()
-            if token:
-                encrypted_password = sha256((encrypted_password + token).encode('utf-8')).hexdigest()
-        return encrypted_password
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Sends one request to the router, reporting it to the instrumentation hooks"""
 
-    def get(self, url: str) -> str:
-        """Retrieves data from the given URL using an authenticated session."""
+        full_url = f"{self.url}/{url}" if url else self.url
+        kwargs.setdefault("timeout", self.policy.timeout)
+        kwargs.setdefault("allow_redirects", False)
+        hooks = get_hooks()
+        if hooks is None:
+            return self.session.request(method, full_url, **kwargs)
+        start = time.perf_counter()
+        status, size = None, 0
+        try:
+            response = self.session.request(method, full_url, **kwargs)
+            status, size = response.status_code, len(response.content)
+            return response
+        finally:
+            hooks.request(self._address, method, url, status, size, time.perf_counter() - start)
 
-        retries = 2
-        while retries > 0:
-            retries -= 1
+    def get(self, url: str, use_cache: bool = True) -> str:
+        """Retrieves data from the given URL using an authenticated session.
 
-            get_url = f"{self.url}/{url}"
-            headers = {"Cookie": f"{self.get_cookie_header(False)}"}
+        Cacheable pages are served from cache while fresh, and concurrent
+        callers asking for the same page wait for a single request and share
+        its page or its error.
+        """
 
-            try:
-                response = requests.get(
-                    get_url, timeout=30, headers=headers, allow_redirects=False
+        if not use_cache or not self.cache.ttl(url):
+            return self._get(url)
+        if (cached := self.cache.get(url)) is not None:
+            self._count("cache_hits")
+            return cached
+        self._count("cache_misses")
+
+        with self._inflight_lock:
+            inflight = self._inflight.get(url)
+            if inflight is None:
+                leader = self._inflight[url] = Future()
+        if inflight is not None:
+            # The waiters share the outcome of the request, its error included
+            body = inflight.result()
+            if body is None:
+                # The request was interrupted, not answered
+                return self.get(url)
+            self._count("coalesced")
+            return body
+
+        try:
+            body = self._get(url)
+        except BaseException as err:
+            self._end_inflight(url)
+            if isinstance(err, Exception):
+                leader.set_exception(err)
+            else:
+                leader.set_result(None)
+            raise
+        if body:
+            self.cache.put(url, body)
+        self._end_inflight(url)
+        leader.set_result(body)
+        return body
+
+    def submit_get(self, url: str) -> "Future[str]":
+        """Starts `get(url)` in a thread of this router, the future gives its page"""
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self._pool_maxsize, thread_name_prefix=f"cudy-{self.host}"
                 )
-                if response.status_code == 403:
-                    if self.authenticate():
-                        continue
-                    else:
-                        _LOGGER.error("Error during authentication to %s", url)
-                        break
-                if response.ok:
-                    return response.text
-                else:
-                    break
-            except Exception:  # pylint: disable=broad-except
-                pass
+            return self._executor.submit(self.get, url)
 
-        _LOGGER.error("Error retrieving data from %s", url)
-        return ""
+    def _end_inflight(self, url: str) -> None:
+        with self._inflight_lock:
+            del self._inflight[url]
+
+    def _get(self, url: str) -> str:
+        """Retrieves data from the router, bypassing the cache"""
+
+        return self._send("GET", url)
 
     def post(self, url: str, body_multipart: dict = None) -> str:
         """Retrieves data from the given URL using an authenticated session."""
 
-        retries = 2
-        while retries > 0:
-            retries -= 1
+        if body_multipart is None:
+            body_multipart = {}
 
-            get_url = f"{self.url}/{url}"
-            headers = {"Cookie": f"{self.get_cookie_header(False)}"}
+        def prepare() -> dict:
+            # Whatever the outcome, the post may have changed the router state
+            self.cache.invalidate()
             body_multipart["token"] = self.token
             body_multipart["timeclock"] = int(math.floor(time.time()/1000))
+            return {"files": body_multipart}
+
+        return self._send("POST", url, prepare)
+
+    def _send(self, method: str, url: str, prepare: Callable[[], dict] = dict) -> str:
+        """Sends an authenticated request following the policy, returns the page
 
+        Raises AuthenticationError, RouterHTTPError, RouterConnectionError
+        (RouterTimeoutError when the router did not answer in time) or
+        CircuitOpenError while the router is given up on.
+        """
+
+        self.breaker.before_call(self._address)
+        try:
+            text = self._attempt(method, url, prepare)
+        except RouterConnectionError:
+            self.breaker.record_failure()
+            raise
+        except RouterHTTPError as err:
+            if err.status < 500:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        except AuthenticationError:
+            self.breaker.record_success()
+            raise
+        except BaseException:
+            # Cancelled, interrupted or a bug: nothing learned about the router
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return text
+
+    def _attempt(self, method: str, url: str, prepare: Callable[[], dict]) -> str:
+        attempt = 0
+        reauthenticated = False
+        while True:
+            attempt += 1
             try:
-                response = requests.post(
-                    get_url, timeout=30, files=body_multipart, headers=headers, allow_redirects=False
-                )
+                if not self._ensure_authenticated():
+                    raise AuthenticationError(f"Authentication to {self._address} failed")
+                cookie = self.auth_cookie
+                # `prepare` builds the arguments anew for each attempt
+                response = self._request(method, url, **prepare())
                 if response.status_code == 403:
-                    if self.authenticate():
-                        continue
-                    else:
-                        _LOGGER.error("Error during authentication to %s", url)
-                        break
+                    self._count("reauths")
+                    if reauthenticated or not self._reauthenticate(cookie, response.text):
+                        raise AuthenticationError(f"Authentication to {self._address} failed")
+                    # A renewed session does not use up an attempt
+                    reauthenticated = True
+                    attempt -= 1
+                    continue
+            except requests.exceptions.Timeout as err:
+                error: Exception = RouterTimeoutError(f"{self._address} timed out: {err}")
+            except requests.exceptions.RequestException as err:
+                error = RouterConnectionError(f"{self._address} unreachable: {err}")
+            else:
                 if response.ok:
+                    self._session_used = time.monotonic()
                     return response.text
-                else:
-                    break
-            except Exception:  # pylint: disable=broad-except
-                pass
+                error = RouterHTTPError(response.status_code, url)
+                if response.status_code < 500:
+                    raise error
 
-        _LOGGER.error("Error retrieving data from %s", url)
-        return ""
+            if attempt >= self.policy.attempts:
+                _LOGGER.error("Error retrieving data from %s: %s", url, error)
+                raise error
+            _LOGGER.debug("Retrying %s after: %s", url, error)
+            self._count("retries")
+            time.sleep(self.policy.delay(attempt))
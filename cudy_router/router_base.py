@@ -0,0 +1,96 @@
+"""Logic shared by the blocking and the asyncio routers"""
+
+import math
+import time
+import urllib.parse
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from hashlib import sha256
+
+from . import cudy_parser
+from .cache import ResponseCache
+from .instrumentation import get_hooks
+
+
+class RouterBase(ABC):
+    """Login form, session expiry and cache handling of `CudyRouter` and `AsyncCudyRouter`
+
+    Nothing here does I/O: subclasses send the requests with their own
+    HTTP client and set the attributes below.
+    """
+
+    host: str
+    port: int
+    username: str
+    password: str
+    cache: ResponseCache
+    session_timeout: timedelta | None
+    session_margin: timedelta
+    _session_used: float | None
+
+    @property
+    @abstractmethod
+    def auth_cookie(self) -> str | None:
+        """Returns the current `sysauth` session cookie, if any."""
+
+    @property
+    def _address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def _count(self, name: str) -> None:
+        if (hooks := get_hooks()) is not None:
+            hooks.count(name, self._address)
+
+    def _session_stale(self) -> bool:
+        """Whether there is no session or it is about to reach the idle timeout"""
+
+        if not self.auth_cookie:
+            return True
+        if self.session_timeout is None or self._session_used is None:
+            return False
+        idle = time.monotonic() - self._session_used
+        return idle >= (self.session_timeout - self.session_margin).total_seconds()
+
+    @staticmethod
+    def _login_info(login_page: str | None) -> dict[str, str] | None:
+        """Login form fields of a 403 page, None if it has no login form"""
+
+        if not login_page:
+            return None
+        data = cudy_parser.get_login_info(login_page)
+        return data if data.get("token") or data.get("_csrf") else None
+
+    def _login_form(self, data: dict[str, str]) -> str:
+        """Builds the url-encoded login form from the login page input fields"""
+
+        import tzlocal  # pylint: disable=import-outside-toplevel
+
+        encrypted_password = self._encrypt_password(self.password, data.get('token'), data.get('salt'))
+        params_list = [
+            f"zonename={tzlocal.get_localzone_name()}",
+            f"timeclock={int(math.floor(time.time()/1000))}",
+            f"luci_username={urllib.parse.quote(self.username)}",
+            f"luci_password={urllib.parse.quote(encrypted_password)}",
+            "luci_language=en"
+        ]
+        if data.get('_csrf'):
+            params_list.append(f"_csrf={data['_csrf']}")
+        if data.get('token'):
+            params_list.append(f"token={data['token']}")
+        if data.get('salt'):
+            params_list.append(f"salt={data['salt']}")
+        return "&".join(params_list)
+
+    @staticmethod
+    def _encrypt_password(clear_password: str, token: str, salt: str) -> str:
+        encrypted_password = clear_password
+        if salt:
+            encrypted_password = sha256((clear_password + salt).encode("utf-8")).hexdigest()
+            if token:
+                encrypted_password = sha256((encrypted_password + token).encode('utf-8')).hexdigest()
+        return encrypted_password
+
+    def invalidate(self, url: str = None) -> None:
+        """Drops the cached pages of `url` and of the paths below it, or all of them"""
+
+        self.cache.invalidate(url)
@@ -0,0 +1,289 @@
+"""Adaptive polling of a fleet: each router endpoint is polled as often as it changes
+
+Every (router, collector) pair has its own interval. It shrinks when a poll
+finds the content changed and grows when it did not, within the bounds of
+its `IntervalPolicy`, and backs off at once when the poll fails. The pairs
+of the whole fleet wait in a single priority queue ordered by due time, so
+the busiest endpoints are polled first and idle ones cost few requests.
+"""
+
+import asyncio
+import heapq
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from .async_router import AsyncCudyRouter
+from .fleet import COLLECTORS, DEFAULT_CONCURRENCY, DEFAULT_ROUTER_TIMEOUT, FleetRouter
+from .models.fleet import FleetResult, RouterEntry
+from .resilience import RequestPolicy
+from .router import MIN_TIME_BETWEEN_UPDATES, SCAN_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_INTERVAL = timedelta(minutes=10)
+
+# Fields left out of the change detection: the connected time changes on
+# every poll without telling anything about the modem state
+DEFAULT_IGNORED_FIELDS: Dict[str, set] = {"modem": {"connected_time"}}
+
+
+class IntervalPolicy:
+    """Bounds of the poll interval of an endpoint and how fast it adapts
+
+    The interval is multiplied by `speedup` after a poll that found changes,
+    by `slowdown` after one that did not and by `failure_backoff` after a
+    failed poll, and kept between `minimum` and `maximum`.
+    """
+
+    def __init__(
+        self,
+        minimum: timedelta = MIN_TIME_BETWEEN_UPDATES,
+        maximum: timedelta = DEFAULT_MAX_INTERVAL,
+        initial: timedelta = SCAN_INTERVAL,
+        speedup: float = 0.5,
+        slowdown: float = 1.5,
+        failure_backoff: float = 2.0,
+    ) -> None:
+        """Initialize."""
+        if minimum > maximum:
+            raise ValueError("The minimum interval is larger than the maximum")
+        self.minimum = minimum.total_seconds()
+        self.maximum = maximum.total_seconds()
+        self.initial = self._bound(initial.total_seconds())
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.failure_backoff = failure_backoff
+
+    def _bound(self, interval: float) -> float:
+        return min(self.maximum, max(self.minimum, interval))
+
+    def next_interval(self, interval: float, changed: bool) -> float:
+        """Seconds until the next poll after a successful one"""
+
+        return self._bound(interval * (self.speedup if changed else self.slowdown))
+
+    def failure_interval(self, interval: float) -> float:
+        """Seconds until the next poll after a failed one"""
+
+        return self._bound(interval * self.failure_backoff)
+
+
+@dataclass
+class ScheduledTarget:
+    """State of one (router, collector) pair"""
+
+    entry: RouterEntry
+    collector: str
+    interval: float
+    due: float = 0.0
+    fingerprint: Optional[int] = None
+    polls: int = 0
+    changes: int = 0
+    failures: int = 0
+    last_poll: Optional[datetime] = None
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.entry.router_id, self.collector
+
+
+class AdaptiveScheduler:
+    """Polls every collector of every router at its own adaptive rate
+
+    At most `concurrency` polls run at once and each is cut off after
+    `timeout`. Results are streamed as `FleetResult` records holding the
+    polled collector only, for the polls that found changes or failed
+    (every poll with `emit_unchanged`). Routers are created without response
+    cache so each poll sees the current content.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[Union[RouterEntry, dict]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: timedelta = DEFAULT_ROUTER_TIMEOUT,
+        collect: Iterable[str] = COLLECTORS,  # pylint: disable=redefined-outer-name
+        policies: Optional[Dict[str, IntervalPolicy]] = None,
+        policy: Optional[RequestPolicy] = None,
+        ignored_fields: Optional[Dict[str, set]] = None,
+        emit_unchanged: bool = False,
+    ) -> None:
+        """Initialize.
+
+        `policies` gives the IntervalPolicy of each collector, the others
+        use the default one. `policy` is the RequestPolicy of the routers.
+        """
+        self.entries = [RouterEntry.model_validate(entry) for entry in entries]
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.collect = tuple(collect)
+        unknown = set(self.collect) - set(COLLECTORS)
+        if unknown:
+            raise ValueError(f"Unknown collectors: {', '.join(sorted(unknown))}")
+        self.policies = policies or {}
+        self.policy = policy
+        self.ignored_fields = DEFAULT_IGNORED_FIELDS if ignored_fields is None else ignored_fields
+        self.emit_unchanged = emit_unchanged
+        self.targets: List[ScheduledTarget] = [
+            ScheduledTarget(entry, collector, self._interval_policy(collector).initial)
+            for entry in self.entries
+            for collector in self.collect
+        ]
+        self._routers: Dict[str, FleetRouter] = {}
+        self._queue: List[Tuple[float, int, ScheduledTarget]] = []
+        self._sequence = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+
+    async def __aenter__(self) -> "AdaptiveScheduler":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Closes the sessions kept open to every router."""
+
+        routers = list(self._routers.values())
+        self._routers.clear()
+        await asyncio.gather(*(router.close() for router in routers))
+
+    def _interval_policy(self, collector: str) -> IntervalPolicy:
+        policy = self.policies.get(collector)
+        if policy is None:
+            policy = self.policies[collector] = IntervalPolicy()
+        return policy
+
+    def _router(self, entry: RouterEntry) -> FleetRouter:
+        router = self._routers.get(entry.router_id)
+        if router is None:
+            router = FleetRouter(
+                AsyncCudyRouter(
+                    entry.host, entry.username, entry.password, entry.port,
+                    cache_policies={}, policy=self.policy,
+                )
+            )
+            self._routers[entry.router_id] = router
+        return router
+
+    def _schedule(self, target: ScheduledTarget, delay: float) -> None:
+        target.due = time.monotonic() + delay
+        self._sequence += 1
+        heapq.heappush(self._queue, (target.due, self._sequence, target))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _fingerprint(self, collector: str, value) -> int:
+        return hash(value.model_dump_json(exclude=self.ignored_fields.get(collector)))
+
+    async def poll(self, target: ScheduledTarget) -> Optional[FleetResult]:
+        """Polls one target and adapts its interval, returns the record to emit if any"""
+
+        interval_policy = self._interval_policy(target.collector)
+        result = FleetResult(router=target.entry.router_id, timestamp=datetime.now())
+        start = time.perf_counter()
+        target.polls += 1
+        target.last_poll = result.timestamp
+        try:
+            value = await asyncio.wait_for(
+                self._router(target.entry).collect(target.collector), self.timeout.total_seconds()
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            target.failures += 1
+            target.interval = interval_policy.failure_interval(target.interval)
+            if isinstance(err, asyncio.TimeoutError):
+                result.errors[target.collector] = f"No response within {self.timeout.total_seconds()}s"
+            else:
+                result.errors[target.collector] = f"{type(err).__name__}: {err}"
+            _LOGGER.debug("Polling %s of %s failed, next in %.0fs", target.collector, target.entry.router_id, target.interval)
+            result.duration = time.perf_counter() - start
+            return result
+
+        fingerprint = self._fingerprint(target.collector, value)
+        changed = fingerprint != target.fingerprint
+        # The first poll has nothing to compare with
+        if target.fingerprint is not None:
+            target.interval = interval_policy.next_interval(target.interval, changed)
+        if changed:
+            target.changes += 1
+        target.fingerprint = fingerprint
+        result.duration = time.perf_counter() - start
+        if not changed and not self.emit_unchanged:
+            return None
+        setattr(result, target.collector, value)
+        return result
+
+    async def run(self) -> AsyncIterator[FleetResult]:
+        """Polls forever, yielding the records as the polls complete
+
+        Targets start at a random offset within their first interval so the
+        fleet is not polled in lock step.
+        """
+
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: asyncio.Queue[FleetResult] = asyncio.Queue()
+        tasks = set()
+
+        async def poll(target: ScheduledTarget) -> None:
+            try:
+                if (result := await self.poll(target)) is not None:
+                    await results.put(result)
+            finally:
+                semaphore.release()
+                if self._running:
+                    self._schedule(target, target.interval)
+
+        async def dispatch() -> None:
+            # The flag ends the loop even if wait_for() swallowed the cancellation
+            while self._running:
+                delay = self._queue[0][0] - time.monotonic() if self._queue else None
+                if delay is None or delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                _, _, target = heapq.heappop(self._queue)
+                await semaphore.acquire()
+                task = asyncio.ensure_future(poll(target))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        self._running = True
+        self._queue.clear()
+        for target in self.targets:
+            self._schedule(target, random.uniform(0, target.interval))
+        dispatcher = asyncio.ensure_future(dispatch())
+        try:
+            while True:
+                yield await results.get()
+        finally:
+            self._running = False
+            dispatcher.cancel()
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(dispatcher, *tasks, return_exceptions=True)
+            self._wakeup = None
+
+    def stats(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Current interval and counters of each (router, collector)"""
+
+        return {
+            target.key: {
+                "interval": target.interval,
+                "polls": target.polls,
+                "changes": target.changes,
+                "failures": target.failures,
+            }
+            for target in self.targets
+        }
+
+
+def get_adaptive_scheduler(entries: Iterable[Union[RouterEntry, dict]], **kwargs) -> AdaptiveScheduler:
+    return AdaptiveScheduler(entries, **kwargs)
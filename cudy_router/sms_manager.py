@@ -1,33 +1,119 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, List, Tuple
 
 from . import CudyRouter
 from . import cudy_parser
-from .models.sms import SMSSummary, SMS
+from .cache import DEFAULT_MEMO_SIZE, ResultMemo
+from .models.lite import LiteSMS, build_model
+from .models.sms import SMSSummary, SMS, SMSReadResult
+
+if TYPE_CHECKING:
+    from .async_router import AsyncCudyRouter
+
+SMS_STATUS_URL = "admin/network/gcom/sms/status"
+
+DEFAULT_READ_CONCURRENCY = 4
+
 
 class SMSManager:
 
-    def __init__(self, cudy_router: CudyRouter):
+    def __init__(self, cudy_router: CudyRouter, memo_size: int = DEFAULT_MEMO_SIZE, lite: bool = False):
+        """ Results are memoized on the content of the fetched pages, keeping
+            up to `memo_size` of them (0 disables it). With `lite`, results are
+            slotted dataclasses built without pydantic validation """
         self.cudy_router = cudy_router
+        self.lite = lite
+        self._memo = ResultMemo(memo_size)
 
     def get_sms_summary(self) -> SMSSummary:
         """ Retrieve SMS Summary """
 
-        sms_summary = cudy_parser.get_sms_summary(self.cudy_router.get("admin/network/gcom/sms/status"))
-        return SMSSummary.model_validate(sms_summary)
+        return self._sms_summary(self.cudy_router.get(SMS_STATUS_URL))
 
     def get_sms_list(self, box: str = "inbox") -> List[SMS]:
         """ Retrieve inbox or outbox list of messages """
 
-        cudy_box = "rec" if box == "inbox" else "sto"
-        sms_list = cudy_parser.get_sms_list(self.cudy_router.get(f"admin/network/gcom/sms/smslist?smsbox={cudy_box}"))
-        for sms in sms_list:
-            sms['box'] = box
-        return [SMS.model_validate(sms) for sms in sms_list]
+        return self._sms_list(self.cudy_router.get(self._sms_list_url(box)), box)
 
     def read_sms(self, cfg_or_sms: str | SMS, box: str = None) -> SMS:
         """ Read a SMS from one box """
 
-        if isinstance(cfg_or_sms, SMS):
+        url, box = self._read_sms_url(cfg_or_sms, box)
+        return self._sms(self.cudy_router.get(url), box)
+
+    def read_sms_many(
+        self,
+        cfgs_or_sms: Iterable[str | SMS],
+        box: str = None,
+        max_in_flight: int = DEFAULT_READ_CONCURRENCY,
+    ) -> List[SMSReadResult]:
+        """ Read several SMS concurrently, at most `max_in_flight` requests at a time
+
+            Results come back in input order; a message that could not be read
+            has its `error` set instead of failing the whole batch.
+        """
+
+        reads = self._reads(cfgs_or_sms, box)
+        if not reads:
+            return []
+
+        def read(cfg: str, url: str, sms_box: str | None) -> SMSReadResult:
+            try:
+                return self._read_result(cfg, self.cudy_router.get(url), sms_box)
+            except Exception as err:  # pylint: disable=broad-except
+                return SMSReadResult(cfg=cfg, error=f"{type(err).__name__}: {err}")
+
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+            return list(executor.map(lambda args: read(*args), reads))
+
+    def _reads(self, cfgs_or_sms: Iterable[str | SMS], box: str = None) -> List[Tuple[str, str, str | None]]:
+        """ (cfg, readsms URL, box) for each message to read """
+
+        reads = []
+        for cfg_or_sms in cfgs_or_sms:
+            url, sms_box = self._read_sms_url(cfg_or_sms, box)
+            cfg = cfg_or_sms.cfg if isinstance(cfg_or_sms, (SMS, LiteSMS)) else cfg_or_sms
+            reads.append((cfg, url, sms_box))
+        return reads
+
+    def _read_result(self, cfg: str, input_html: str, box: str | None) -> SMSReadResult:
+        """ Parses one read message, reporting failures in the result """
+
+        if not input_html:
+            return SMSReadResult(cfg=cfg, error="No response from the router")
+        try:
+            # Built without validation so that it can carry lite messages too
+            return SMSReadResult.model_construct(cfg=cfg, sms=self._sms(input_html, box), error=None)
+        except Exception as err:  # pylint: disable=broad-except
+            return SMSReadResult(cfg=cfg, error=f"{type(err).__name__}: {err}")
+
+    def _sms_summary(self, input_html: str) -> SMSSummary:
+        def build() -> SMSSummary:
+            sms_summary = cudy_parser.get_sms_summary(input_html)
+            return build_model(SMSSummary, sms_summary, self.lite)
+
+        return self._memo.get_or_build(["sms_summary", input_html], build)
+
+    @staticmethod
+    def _sms_list_url(box: str) -> str:
+        cudy_box = "rec" if box == "inbox" else "sto"
+        return f"admin/network/gcom/sms/smslist?smsbox={cudy_box}"
+
+    def _sms_list(self, input_html: str, box: str) -> List[SMS]:
+        def build() -> List[SMS]:
+            sms_list = cudy_parser.get_sms_list(input_html)
+            for sms in sms_list:
+                sms['box'] = box
+            return [build_model(SMS, sms, self.lite) for sms in sms_list]
+
+        # A fresh list so that callers can't alter the memoized one
+        return list(self._memo.get_or_build(["sms_list", box, input_html], build))
+
+    @staticmethod
+    def _read_sms_url(cfg_or_sms: str | SMS, box: str = None) -> tuple[str, str | None]:
+        """ Returns the readsms URL and the box the message belongs to """
+
+        if isinstance(cfg_or_sms, (SMS, LiteSMS)):
             cfg = cfg_or_sms.cfg
             box = cfg_or_sms.box if cfg_or_sms.box else box
         else:
@@ -36,11 +122,68 @@ class SMSManager:
             cudy_box_arg = "&smsbox=rec" if box == "inbox" else "&smsbox=sto"
         else:
             cudy_box_arg = ""
-        sms = cudy_parser.read_sms(self.cudy_router.get(f"admin/network/gcom/sms/readsms?cfg={cfg}{cudy_box_arg}"))
-        if box:
-            sms['box'] = box
-        return SMS.model_validate(sms)
+        return f"admin/network/gcom/sms/readsms?cfg={cfg}{cudy_box_arg}", box
+
+    def _sms(self, input_html: str, box: str | None) -> SMS:
+        def build() -> SMS:
+            sms = cudy_parser.read_sms(input_html)
+            if box:
+                sms['box'] = box
+            return build_model(SMS, sms, self.lite)
+
+        return self._memo.get_or_build(["sms", str(box), input_html], build)
+
+
+class AsyncSMSManager(SMSManager):
+    """ asyncio counterpart of `SMSManager` working with an `AsyncCudyRouter`,
+        pages are parsed off the event loop """
+
+    async def get_sms_summary(self) -> SMSSummary:
+        """ Retrieve SMS Summary """
+
+        return await self.cudy_router.parse(self._sms_summary, await self.cudy_router.get(SMS_STATUS_URL))
+
+    async def get_sms_list(self, box: str = "inbox") -> List[SMS]:
+        """ Retrieve inbox or outbox list of messages """
+
+        return await self.cudy_router.parse(self._sms_list, await self.cudy_router.get(self._sms_list_url(box)), box)
+
+    async def read_sms(self, cfg_or_sms: str | SMS, box: str = None) -> SMS:
+        """ Read a SMS from one box """
+
+        url, box = self._read_sms_url(cfg_or_sms, box)
+        return await self.cudy_router.parse(self._sms, await self.cudy_router.get(url), box)
+
+    async def read_sms_many(
+        self,
+        cfgs_or_sms: Iterable[str | SMS],
+        box: str = None,
+        max_in_flight: int = DEFAULT_READ_CONCURRENCY,
+    ) -> List[SMSReadResult]:
+        """ Read several SMS concurrently (see `SMSManager.read_sms_many`) """
+
+        # Already loaded by the running event loop, only deferred for sync users
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        reads = self._reads(cfgs_or_sms, box)
+        if not reads:
+            return []
+        semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+        async def read(cfg: str, url: str, sms_box: str | None) -> SMSReadResult:
+            try:
+                async with semaphore:
+                    input_html = await self.cudy_router.get(url)
+                return await self.cudy_router.parse(self._read_result, cfg, input_html, sms_box)
+            except Exception as err:  # pylint: disable=broad-except
+                return SMSReadResult(cfg=cfg, error=f"{type(err).__name__}: {err}")
+
+        return list(await asyncio.gather(*(read(*args) for args in reads)))
 
 
 def get_sms_manager(cudy_router: CudyRouter) -> SMSManager:
     return SMSManager(cudy_router)
+
+
+def get_async_sms_manager(cudy_router: "AsyncCudyRouter") -> AsyncSMSManager:
+    return AsyncSMSManager(cudy_router)
@@ -0,0 +1,155 @@
+"""Incremental synchronisation of the router SMS boxes into a local store"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .models.sms import SMS, SMSDelta
+from .sms_manager import SMSManager
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sms (
+    router TEXT NOT NULL,
+    box TEXT NOT NULL,
+    cfg TEXT NOT NULL,
+    idx INTEGER,
+    phone_number TEXT,
+    text TEXT,
+    timestamp TEXT,
+    PRIMARY KEY (router, box, cfg)
+);
+CREATE TABLE IF NOT EXISTS sms_counts (
+    router TEXT NOT NULL,
+    box TEXT NOT NULL,
+    count INTEGER,
+    new_count INTEGER,
+    PRIMARY KEY (router, box)
+);
+"""
+
+
+class SMSSync:
+    """Keeps a SQLite copy of the router inbox/outbox, keyed by `cfg` and `box`
+
+    Each `sync()` first compares the SMS summary counts with the stored
+    ones and skips the list download when nothing changed. Otherwise only
+    messages with an unknown `cfg` are read from the router.
+    """
+
+    def __init__(
+        self, sms_manager: SMSManager, database: str = ":memory:", router_id: str = "default"
+    ) -> None:
+        """Initialize."""
+        if getattr(sms_manager, "lite", False):
+            raise ValueError("SMSSync needs an SMSManager returning pydantic models")
+        self.sms_manager = sms_manager
+        self.router_id = router_id
+        self._db = sqlite3.connect(database, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Closes the local store"""
+
+        self._db.close()
+
+    def sync(self, box: str = "inbox", force: bool = False) -> SMSDelta:
+        """Brings the local copy of a box up to date and returns what changed"""
+
+        summary = self.sms_manager.get_sms_summary()
+        counts = (
+            summary.inbox_count if box == "inbox" else summary.outbox_count,
+            summary.new_messages_count if box == "inbox" else None,
+        )
+        if not force and self._counts(box) == counts:
+            return SMSDelta(box=box, skipped=True)
+
+        listed = self.sms_manager.get_sms_list(box)
+        known = {sms.cfg: sms for sms in self.messages(box)}
+        listed_cfgs = {sms.cfg for sms in listed}
+
+        new, errors = self._full_messages([sms for sms in listed if sms.cfg not in known])
+        removed = [sms for cfg, sms in known.items() if cfg not in listed_cfgs]
+
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sms VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self._row(box, sms) for sms in new],
+            )
+            self._db.executemany(
+                "DELETE FROM sms WHERE router = ? AND box = ? AND cfg = ?",
+                [(self.router_id, box, sms.cfg) for sms in removed],
+            )
+            # Indexes shift when messages are deleted on the router
+            self._db.executemany(
+                "UPDATE sms SET idx = ? WHERE router = ? AND box = ? AND cfg = ?",
+                [(sms.index, self.router_id, box, sms.cfg) for sms in listed if sms.cfg in known],
+            )
+            # Messages that failed to be read must not be skipped next time
+            if not errors:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sms_counts VALUES (?, ?, ?, ?)",
+                    (self.router_id, box, *counts),
+                )
+
+        return SMSDelta(box=box, new=new, removed=removed, errors=errors)
+
+    def messages(self, box: str = "inbox") -> List[SMS]:
+        """Messages of a box as currently stored"""
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT cfg, idx, phone_number, text, timestamp FROM sms"
+                " WHERE router = ? AND box = ? ORDER BY idx",
+                (self.router_id, box),
+            ).fetchall()
+        return [
+            SMS(
+                cfg=cfg,
+                index=index,
+                phone_number=phone_number,
+                text=text,
+                timestamp=datetime.fromisoformat(timestamp) if timestamp else None,
+                box=box,
+            )
+            for cfg, index, phone_number, text, timestamp in rows
+        ]
+
+    def _full_messages(self, listed: List[SMS]) -> Tuple[List[SMS], Dict[str, str]]:
+        """Completes listed messages with the bodies read from the router"""
+
+        messages: List[SMS] = []
+        errors: Dict[str, str] = {}
+        for sms, result in zip(listed, self.sms_manager.read_sms_many(listed)):
+            if result.error:
+                errors[sms.cfg] = result.error
+                continue
+            messages.append(sms.model_copy(update={
+                "phone_number": result.sms.phone_number or sms.phone_number,
+                "text": result.sms.text or sms.text,
+            }))
+        return messages, errors
+
+    def _counts(self, box: str) -> Optional[Tuple[int, Optional[int]]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT count, new_count FROM sms_counts WHERE router = ? AND box = ?",
+                (self.router_id, box),
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _row(self, box: str, sms: SMS) -> Tuple:
+        return (
+            self.router_id,
+            box,
+            sms.cfg,
+            sms.index,
+            sms.phone_number,
+            sms.text,
+            sms.timestamp.isoformat() if sms.timestamp else None,
+        )
+
+
+def get_sms_sync(sms_manager: SMSManager, database: str = ":memory:", **kwargs) -> SMSSync:
+    return SMSSync(sms_manager, database, **kwargs)
@@ -0,0 +1,343 @@
+"""Persistent history of the collected data, in SQLite
+
+Every poll of a router appends its modem metrics, device list and SMS
+summary as rows timestamped with the poll time; SMS messages are stored
+once per (router, box, cfg). Rows are buffered and written in batches,
+one transaction per flush, to a database in WAL mode so that readers do
+not block the writer. Queries select a time range per router or per MAC
+address and return rows, typed models or whole columns for analysis.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .models.fleet import FleetResult
+from .models.sms import SMS
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+# Columns of each table, the poll time first. Lists (bands) are stored comma separated
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "modem": (
+        "timestamp", "router", "network", "mcc", "mnc", "connected_time", "signal",
+        "rssi", "rsrp", "rsrq", "sinr", "sim", "band", "cell_id", "pc_id",
+    ),
+    "devices": ("timestamp", "router", "device_count", "total_up_speed", "total_down_speed"),
+    "device": ("timestamp", "router", "mac", "hostname", "ip", "up_speed", "down_speed"),
+    "sms_summary": ("timestamp", "router", "new_messages_count", "inbox_count", "outbox_count"),
+    "sms": ("timestamp", "router", "box", "cfg", "idx", "phone_number", "text", "sent"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS modem (
+    timestamp REAL NOT NULL, router TEXT NOT NULL, network TEXT, mcc TEXT, mnc TEXT,
+    connected_time INTEGER, signal INTEGER, rssi INTEGER, rsrp INTEGER, rsrq INTEGER,
+    sinr INTEGER, sim INTEGER, band TEXT, cell_id INTEGER, pc_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS modem_router ON modem (router, timestamp);
+CREATE TABLE IF NOT EXISTS devices (
+    timestamp REAL NOT NULL, router TEXT NOT NULL, device_count INTEGER,
+    total_up_speed REAL, total_down_speed REAL
+);
+CREATE INDEX IF NOT EXISTS devices_router ON devices (router, timestamp);
+CREATE TABLE IF NOT EXISTS device (
+    timestamp REAL NOT NULL, router TEXT NOT NULL, mac TEXT NOT NULL, hostname TEXT,
+    ip TEXT, up_speed REAL, down_speed REAL
+);
+CREATE INDEX IF NOT EXISTS device_router ON device (router, timestamp);
+CREATE INDEX IF NOT EXISTS device_mac ON device (mac, timestamp);
+CREATE TABLE IF NOT EXISTS sms_summary (
+    timestamp REAL NOT NULL, router TEXT NOT NULL, new_messages_count INTEGER,
+    inbox_count INTEGER, outbox_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS sms_summary_router ON sms_summary (router, timestamp);
+CREATE TABLE IF NOT EXISTS sms (
+    timestamp REAL NOT NULL, router TEXT NOT NULL, box TEXT NOT NULL, cfg TEXT NOT NULL,
+    idx INTEGER, phone_number TEXT, text TEXT, sent TEXT,
+    PRIMARY KEY (router, box, cfg)
+);
+CREATE INDEX IF NOT EXISTS sms_router ON sms (router, timestamp);
+"""
+
+
+def _epoch(value: datetime | float | None) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+class SnapshotStore:
+    """Appends polls to a SQLite database and queries them back
+
+    Recorded rows are buffered in memory and written once `batch_size` rows
+    are pending or the oldest one waited `flush_interval` seconds (checked
+    when recording), and on `flush()`/`close()`. Queries flush first so
+    they see everything recorded. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        database: str = ":memory:",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        """Initialize."""
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(database, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Durable at each checkpoint rather than each commit, safe with WAL
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._pending: Dict[str, List[Tuple]] = {table: [] for table in TABLES}
+        self._pending_rows = 0
+        self._pending_since: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Writes the pending rows and closes the database"""
+
+        self.flush()
+        self._db.close()
+
+    def _append(self, table: str, rows: Iterable[Tuple]) -> None:
+        with self._lock:
+            pending = self._pending[table]
+            count = len(pending)
+            pending.extend(rows)
+            self._pending_rows += len(pending) - count
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            due = self._pending_rows >= self.batch_size or (
+                time.monotonic() - self._pending_since >= self.flush_interval
+            )
+            if due:
+                self._flush()
+
+    def flush(self) -> None:
+        """Writes the pending rows in one transaction"""
+
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending_rows:
+            return
+        with self._db:
+            for table, rows in self._pending.items():
+                if not rows:
+                    continue
+                placeholders = ", ".join("?" * len(TABLES[table]))
+                # A message already stored keeps the time it was first seen
+                verb = "INSERT OR IGNORE" if table == "sms" else "INSERT"
+                self._db.executemany(f"{verb} INTO {table} VALUES ({placeholders})", rows)
+                rows.clear()
+        self._pending_rows = 0
+        self._pending_since = None
+
+    def record_modem(self, router: str, modem_info, timestamp: float = None) -> None:
+        """Appends a `ModemInfo` (or PartialModemInfo)"""
+
+        network = modem_info.network
+        cell = modem_info.cell
+        self._append("modem", [(
+            time.time() if timestamp is None else timestamp,
+            router,
+            network.name if network else None,
+            network.attributes.mcc if network else None,
+            network.attributes.mnc if network else None,
+            modem_info.connected_time,
+            modem_info.signal,
+            modem_info.rssi,
+            modem_info.rsrp,
+            modem_info.rsrq,
+            modem_info.sinr,
+            modem_info.sim,
+            ",".join(modem_info.band) if modem_info.band is not None else None,
+            cell.cell_id if cell else None,
+            cell.pc_id if cell else None,
+        )])
+
+    def record_devices(self, router: str, devices_info, timestamp: float = None) -> None:
+        """Appends the totals and every device of a `DevicesInfo`"""
+
+        timestamp = time.time() if timestamp is None else timestamp
+        stats = devices_info.stats
+        self._append("devices", [(
+            timestamp,
+            router,
+            devices_info.device_count,
+            stats.total_up_speed if stats else None,
+            stats.total_down_speed if stats else None,
+        )])
+        self._append("device", [
+            (timestamp, router, device.mac, device.hostname, device.ip, device.up_speed, device.down_speed)
+            for device in devices_info.devices
+        ])
+
+    def record_sms_summary(self, router: str, summary, timestamp: float = None) -> None:
+        """Appends an `SMSSummary`"""
+
+        self._append("sms_summary", [(
+            time.time() if timestamp is None else timestamp,
+            router,
+            summary.new_messages_count,
+            summary.inbox_count,
+            summary.outbox_count,
+        )])
+
+    def record_sms(self, router: str, messages: Iterable, box: str = None, timestamp: float = None) -> None:
+        """Stores the messages not stored yet, `box` defaulting to each message's"""
+
+        timestamp = time.time() if timestamp is None else timestamp
+        self._append("sms", [
+            (
+                timestamp,
+                router,
+                box or sms.box,
+                sms.cfg,
+                sms.index,
+                sms.phone_number,
+                sms.text,
+                sms.timestamp.isoformat() if sms.timestamp else None,
+            )
+            for sms in messages
+        ])
+
+    def record(self, result: FleetResult) -> None:
+        """Appends whatever a fleet poll collected"""
+
+        timestamp = result.timestamp.timestamp()
+        if result.modem is not None:
+            self.record_modem(result.router, result.modem, timestamp)
+        if result.devices is not None:
+            self.record_devices(result.router, result.devices, timestamp)
+        if result.sms_summary is not None:
+            self.record_sms_summary(result.router, result.sms_summary, timestamp)
+
+    def _select(
+        self,
+        table: str,
+        router: str = None,
+        mac: str = None,
+        box: str = None,
+        since: datetime | float | None = None,
+        until: datetime | float | None = None,
+        columns: Sequence[str] = None,
+    ) -> Tuple[Tuple[str, ...], List[Tuple]]:
+        if table not in TABLES:
+            raise KeyError(f"Unknown table {table}")
+        columns = tuple(columns or TABLES[table])
+        unknown = set(columns) - set(TABLES[table])
+        if unknown:
+            raise KeyError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        if mac is not None and table != "device":
+            raise ValueError("Only the device table can be queried by MAC address")
+        if box is not None and table != "sms":
+            raise ValueError("Only the sms table can be queried by box")
+
+        conditions, parameters = [], []
+        for column, value in (("router", router), ("mac", mac), ("box", box)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        for operator, value in ((">=", _epoch(since)), ("<", _epoch(until))):
+            if value is not None:
+                conditions.append(f"timestamp {operator} ?")
+                parameters.append(value)
+        query = f"SELECT {', '.join(columns)} FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp"
+
+        with self._lock:
+            self._flush()
+            return columns, self._db.execute(query, parameters).fetchall()
+
+    def rows(self, table: str, **filters) -> List[Dict[str, Any]]:
+        """Rows of a table as dicts, oldest first
+
+        Filters: `router`, `mac` (device table), `box` (sms table), `since`
+        (inclusive) and `until` (exclusive) as datetimes or epoch seconds,
+        and `columns`.
+        """
+
+        columns, rows = self._select(table, **filters)
+        return [dict(zip(columns, row)) for row in rows]
+
+    def columns(self, table: str, **filters) -> Dict[str, list]:
+        """Columnar export of a table: one list per column (filters of `rows`)"""
+
+        columns, rows = self._select(table, **filters)
+        if not rows:
+            return {column: [] for column in columns}
+        return dict(zip(columns, map(list, zip(*rows))))
+
+    def to_numpy(self, table: str, **filters) -> Dict[str, "np.ndarray"]:
+        """Columnar export as NumPy arrays, missing numbers as NaN"""
+
+        try:
+            import numpy as np  # pylint: disable=import-outside-toplevel
+        except ImportError as err:
+            raise ImportError("numpy is not installed") from err
+        exported = {}
+        for column, values in self.columns(table, **filters).items():
+            if all(value is None or isinstance(value, (int, float)) for value in values):
+                exported[column] = np.array([np.nan if value is None else value for value in values], dtype=float)
+            else:
+                exported[column] = np.array(values, dtype=object)
+        return exported
+
+    def to_parquet(self, table: str, path: str, **filters) -> None:
+        """Writes a table (filters of `rows`) to a Parquet file"""
+
+        try:
+            import pyarrow  # pylint: disable=import-outside-toplevel
+            import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+        except ImportError as err:
+            raise ImportError("pyarrow is not installed") from err
+        pyarrow.parquet.write_table(pyarrow.table(self.columns(table, **filters)), path)
+
+    def sms(self, router: str, box: str = None, **filters) -> List[SMS]:
+        """Stored messages of a router, in the order they were first seen"""
+
+        return [
+            SMS(
+                cfg=row["cfg"],
+                index=row["idx"],
+                phone_number=row["phone_number"],
+                text=row["text"],
+                timestamp=datetime.fromisoformat(row["sent"]) if row["sent"] else None,
+                box=row["box"],
+            )
+            for row in self.rows("sms", router=router, box=box, **filters)
+        ]
+
+    def prune(self, before: datetime | float) -> int:
+        """Deletes the rows recorded before a time, returns how many"""
+
+        before = _epoch(before)
+        deleted = 0
+        with self._lock:
+            self._flush()
+            with self._db:
+                for table in TABLES:
+                    deleted += self._db.execute(f"DELETE FROM {table} WHERE timestamp < ?", (before,)).rowcount
+        return deleted
+
+
+def get_snapshot_store(database: str = ":memory:", **kwargs) -> SnapshotStore:
+    return SnapshotStore(database, **kwargs)
@@ -0,0 +1,38 @@
+"""Emulated routers for the blocking client, served from a background event loop"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from cudy_router.emulator import EmulatorServer, get_emulator_server
+
+
+@contextmanager
+def serve_in_thread(count: int = 1, **kwargs) -> Iterator[EmulatorServer]:
+    """`get_emulator_server(count, **kwargs)` listening until the block exits
+
+    Clients should be closed within the block, the connections still open
+    are dropped on exit.
+    """
+
+    async def shutdown() -> None:
+        await server.close()
+        # Connections still open, now that no client is left
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = get_emulator_server(count, **kwargs)
+    try:
+        asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+        yield server
+    finally:
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,152 @@
+"""Response cache of the routers and coalescing of concurrent requests"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from cudy_router import cache
+from cudy_router.async_router import AsyncCudyRouter
+from cudy_router.cache import ResponseCache
+from cudy_router.emulator import get_emulator_server
+from cudy_router.exceptions import RouterHTTPError
+from cudy_router.resilience import CircuitBreaker, RequestPolicy
+from cudy_router.router import CudyRouter
+
+from emulated import serve_in_thread
+
+DEVLIST = "admin/network/devices/devlist"
+
+
+def test_ttl_follows_the_longest_policy_on_a_path_boundary():
+    responses = ResponseCache(
+        {
+            "admin/network": timedelta(seconds=30),
+            "admin/network/devices": timedelta(seconds=5),
+            "admin/status": timedelta(0),
+        }
+    )
+
+    assert responses.ttl("admin/network/devices/devlist?detail=1") == 5
+    assert responses.ttl("admin/network?tab=lan") == 30
+    assert responses.ttl("admin/networking") is None
+    assert responses.ttl("admin/status") is None
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock = SimpleNamespace(monotonic=lambda: 100.0)
+    monkeypatch.setattr(cache, "time", clock)
+    responses = ResponseCache({DEVLIST: timedelta(seconds=5)})
+
+    responses.put(DEVLIST, "page")
+    clock.monotonic = lambda: 104.9
+    assert responses.get(DEVLIST) == "page"
+    clock.monotonic = lambda: 105.0
+    assert responses.get(DEVLIST) is None
+    assert len(responses) == 0
+
+
+def test_invalidate_drops_the_path_and_the_paths_below_it():
+    responses = ResponseCache({"admin": timedelta(minutes=1)})
+    urls = ("admin/network", "admin/network/devices?detail=1", "admin/networking", "admin/status")
+    for url in urls:
+        responses.put(url, url)
+
+    responses.invalidate("admin/network")
+
+    assert [responses.get(url) for url in urls] == [None, None, "admin/networking", "admin/status"]
+    responses.invalidate()
+    assert len(responses) == 0
+
+
+def test_concurrent_gets_share_one_request_then_hit_the_cache():
+    with serve_in_thread(latency=0.2) as server, CudyRouter("127.0.0.1", "admin", "admin", server.ports[0]) as router:
+        assert router.authenticate()
+        stats = server.routers[0].stats
+        before = stats["requests"]
+
+        with ThreadPoolExecutor(8) as pool:
+            pages = list(pool.map(lambda _: router.get(DEVLIST), range(8)))
+        assert stats["requests"] - before == 1
+        assert len(set(pages)) == 1 and "devlist" not in pages[0]
+
+        assert router.get(DEVLIST) == pages[0]
+        assert stats["requests"] - before == 1
+
+
+def test_concurrent_gets_share_the_error_of_the_request():
+    policy = RequestPolicy(attempts=1)
+    with serve_in_thread(latency=0.2) as server, CudyRouter(
+        "127.0.0.1", "admin", "admin", server.ports[0], policy=policy
+    ) as router:
+        assert router.authenticate()
+        emulated = server.routers[0]
+        emulated.error_rate = 1.0
+        before = emulated.stats["requests"]
+
+        def get() -> Exception:
+            with pytest.raises(RouterHTTPError) as error:
+                router.get(DEVLIST)
+            return error.value
+
+        with ThreadPoolExecutor(5) as pool:
+            errors = list(pool.map(lambda _: get(), range(5)))
+        assert emulated.stats["requests"] - before == 1
+        assert all(error.status == 500 for error in errors)
+        # A failed request is not cached
+        emulated.error_rate = 0.0
+        assert router.get(DEVLIST)
+
+
+def test_post_drops_the_cached_pages():
+    with serve_in_thread() as server, CudyRouter("127.0.0.1", "admin", "admin", server.ports[0]) as router:
+        stats = server.routers[0].stats
+        router.get(DEVLIST)
+        before = stats["requests"]
+        router.get(DEVLIST)
+        assert stats["requests"] == before
+
+        router.post("admin/network/gcom/sms/send", {"phone": "+33600000000", "text": "hi"})
+        router.get(DEVLIST)
+        assert stats["requests"] == before + 2
+
+
+def test_async_waiters_share_the_error_of_the_request():
+    async def scenario():
+        async with get_emulator_server(latency=0.1) as server:
+            async with AsyncCudyRouter(
+                "127.0.0.1", "admin", "admin", server.ports[0], policy=RequestPolicy(attempts=1)
+            ) as router:
+                assert await router.authenticate()
+                emulated = server.routers[0]
+                emulated.error_rate = 1.0
+                before = emulated.stats["requests"]
+                results = await asyncio.gather(*(router.get(DEVLIST) for _ in range(5)), return_exceptions=True)
+                return results, emulated.stats["requests"] - before
+
+    results, requests = asyncio.run(scenario())
+
+    assert requests == 1
+    assert all(isinstance(result, RouterHTTPError) and result.status == 500 for result in results)
+
+
+def test_async_waiter_fetches_the_page_when_the_request_is_cancelled():
+    async def scenario():
+        async with get_emulator_server(latency=0.2) as server:
+            async with AsyncCudyRouter("127.0.0.1", "admin", "admin", server.ports[0]) as router:
+                assert await router.authenticate()
+                leader = asyncio.ensure_future(router.get(DEVLIST))
+                await asyncio.sleep(0.05)
+                waiter = asyncio.ensure_future(router.get(DEVLIST))
+                await asyncio.sleep(0.05)
+                leader.cancel()
+                page = await waiter
+                return leader, page, router.breaker.state
+
+    leader, page, state = asyncio.run(scenario())
+
+    assert leader.cancelled()
+    assert page
+    assert state == CircuitBreaker.CLOSED
@@ -0,0 +1,27 @@
+"""The `cudy-router` console script"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Modules of the optional extras of pyproject.toml
+OPTIONAL_MODULES = ("lxml", "numpy", "pyarrow")
+
+
+def test_console_script_runs_with_the_core_dependencies_only():
+    script = (
+        "import sys\n"
+        f"for name in {OPTIONAL_MODULES!r}:\n"
+        "    sys.modules[name] = None\n"
+        "from cudy_router.cli import main\n"
+        "main(['--help'])\n"
+    )
+
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=False
+    )
+
+    assert completed.returncode == 0, completed.stderr
+    assert "inventory" in completed.stdout
@@ -0,0 +1,123 @@
+"""Parity of the streaming devlist extractor with the BeautifulSoup tree walk"""
+
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from cudy_router import cudy_parser, html_backend
+from cudy_router.primitives import speed
+
+FIXTURES = Path(__file__).parent.parent / "benchmarks" / "fixtures"
+
+ROW = (
+    '<tr><td><div id="cbi-table-1-ipmac"><p class="hidden-xs">10.0.0.2</p>'
+    '<p class="visible-xs">10.0.0.2<br>AA:BB:CC:00:00:01</p></div></td>'
+    '<td><div id="cbi-table-1-speed"><p class="visible-xs">12.5 Kbps<br>3 Mbps</p></div></td>'
+    '<td><div id="cbi-table-1-hostname"><p class="visible-xs">phone<br>5G WiFi</p></div></td></tr>'
+)
+
+VARIANTS = {
+    "plain": f"<table>{ROW}</table>",
+    "nested div before the p": (
+        '<table><tr><td><div id="cbi-table-1-ipmac"><div class="icon">i</div>'
+        '<p class="visible-xs">10.0.0.2<br>AA:BB:CC:00:00:01</p></div></td></tr></table>'
+    ),
+    "unclosed p": (
+        '<table><tr><td><div id="cbi-table-1-ipmac"><p class="visible-xs">10.0.0.2<br>AA:BB:CC:00:00:01'
+        '</div></td><td><div id="cbi-table-1-hostname"><p class="visible-xs">phone<br>Wired</div></td></tr></table>'
+    ),
+    "visible-xs-block class": (
+        '<table><tr><td><div id="cbi-table-1-ipmac"><p class="visible-xs-block">10.0.0.9<br>AA:BB:CC:00:00:09</p>'
+        '<p class="visible-xs">10.0.0.2<br>AA:BB:CC:00:00:01</p></div></td></tr></table>'
+    ),
+    "commented out row": f"<table><!-- {ROW} -->{ROW.replace('00:01', '00:02')}</table>",
+    "div outside any td": (
+        '<table><tr><div id="cbi-table-1-ipmac"><p class="visible-xs">10.0.0.2<br>AA:BB:CC:00:00:01</p></div>'
+        "</tr></table>"
+    ),
+    "row outside any table": ROW,
+    "unclosed rows and cells": f"<table>{ROW.replace('</td>', '').replace('</tr>', '')}{ROW}</table>",
+    "entities and comments in the text": (
+        '<table><tr><td><div id="cbi-table-1-hostname"><p class="visible-xs">Tom&amp;Jerry<!-- x --><br>Wired</p>'
+        '</div></td><td><div id="cbi-table-1-ipmac"><p class="visible-xs">10.0.0.2<br>AA:BB:CC:00:00:01</p></div>'
+        "</td></tr></table>"
+    ),
+    "self closing br and extra spaces": (
+        '<table><tr><td><div id="x-ipmac"><p class="small visible-xs"> 10.0.0.2 <br/> AA:BB:CC:00:00:01 </p>'
+        "</div></td></tr></table>"
+    ),
+}
+
+
+def soup_devices(input_html: str) -> list:
+    """`get_all_devices` as it was before the streaming extractor"""
+
+    devices = []
+    soup = BeautifulSoup(input_html, "html.parser")
+    for br_element in soup.find_all("br"):
+        br_element.replace_with("\n" + br_element.text)
+    for table in soup.find_all("table"):
+        for row in table.find_all("tr"):
+            ip, mac, up_speed, down_speed, hostname = [None, None, None, None, None]
+            for col in row.css.select("td div"):
+                div_id = col.attrs.get("id")
+                content_element = col.css.select_one("p.visible-xs")
+                if not div_id or not content_element:
+                    continue
+                content = content_element.text.strip()
+                if "\n" in content:
+                    if div_id.endswith("ipmac"):
+                        ip, mac = [x.strip() for x in content.split("\n")]
+                    if div_id.endswith("speed"):
+                        up_speed, down_speed = [x.strip() for x in content.split("\n")]
+                    if div_id.endswith("hostname"):
+                        hostname = content.split("\n")[0].strip()
+            if mac or ip:
+                devices.append(
+                    {
+                        "hostname": hostname,
+                        "ip": ip,
+                        "mac": mac,
+                        "up_speed": speed(up_speed),
+                        "down_speed": speed(down_speed),
+                    }
+                )
+    return devices
+
+
+@pytest.mark.parametrize("fixture", sorted(FIXTURES.glob("devlist_*.html")), ids=lambda path: path.stem)
+def test_iter_devices_matches_tree_on_fixtures(fixture):
+    page = fixture.read_text(encoding="utf-8")
+    expected = soup_devices(page)
+
+    assert expected
+    assert list(cudy_parser.iter_devices(page)) == expected
+    # Tags and entities split across the chunks fed to the parser
+    assert list(cudy_parser.iter_devices(page, chunk_size=7)) == expected
+
+
+@pytest.mark.parametrize("markup", VARIANTS.values(), ids=VARIANTS.keys())
+def test_iter_devices_matches_tree_on_malformed_markup(markup):
+    assert list(cudy_parser.iter_devices(markup)) == soup_devices(markup)
+
+
+@pytest.mark.parametrize("backend", html_backend.BACKENDS)
+def test_get_all_devices_on_raw_and_parsed_page(backend):
+    page = (FIXTURES / "devlist_50.html").read_text(encoding="utf-8")
+    previous = html_backend.get_backend()
+    html_backend.set_backend(backend)
+    try:
+        devices = cudy_parser.get_all_devices(page)
+        assert devices == cudy_parser.get_all_devices(cudy_parser.parse_document(page))
+    finally:
+        html_backend.set_backend(previous.name)
+
+    assert devices == soup_devices(page)
+
+
+def test_nested_div_and_unclosed_p_keep_the_device():
+    assert list(cudy_parser.iter_devices(VARIANTS["nested div before the p"])) == [
+        {"hostname": None, "ip": "10.0.0.2", "mac": "AA:BB:CC:00:00:01", "up_speed": None, "down_speed": None}
+    ]
+    assert [device["hostname"] for device in cudy_parser.iter_devices(VARIANTS["unclosed p"])] == ["phone"]
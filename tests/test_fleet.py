@@ -0,0 +1,52 @@
+"""Fleet polling against emulated routers"""
+
+import asyncio
+import threading
+
+from cudy_router.emulator import get_emulator_server
+from cudy_router.fleet import COLLECTORS, FleetPoller
+
+
+def test_unchanged_pages_are_not_parsed_again_on_the_next_poll():
+    async def poll_twice():
+        async with get_emulator_server(2, devices=20, seed=1) as server:
+            entries = [{"host": "127.0.0.1", "port": port, "username": "admin", "password": "admin"} for port in server.ports]
+            async with FleetPoller(entries) as poller:
+                first = {result.router: result async for result in poller.poll_once()}
+                second = {result.router: result async for result in poller.poll_once()}
+        return first, second
+
+    first, second = asyncio.run(poll_twice())
+
+    assert len(first) == 2
+    for router_id, result in first.items():
+        assert not result.errors and not second[router_id].errors
+        # The managers outlive a poll, so their memo answers for the same pages
+        for collector in COLLECTORS:
+            assert getattr(second[router_id], collector) is getattr(result, collector)
+
+
+def test_pages_are_parsed_off_the_event_loop():
+    threads = []
+
+    def record(build):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return build(*args)
+        return wrapper
+
+    async def poll():
+        async with get_emulator_server(devices=20) as server:
+            entries = [{"host": "127.0.0.1", "port": server.ports[0], "username": "admin", "password": "admin"}]
+            async with FleetPoller(entries) as poller:
+                router = poller._router(poller.entries[0])  # pylint: disable=protected-access
+                router.modem._modem_info = record(router.modem._modem_info)
+                router.devices._devices_info = record(router.devices._devices_info)
+                router.sms._sms_summary = record(router.sms._sms_summary)
+                return [result async for result in poller.poll_once()]
+
+    results = asyncio.run(poll())
+
+    assert not results[0].errors
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
@@ -0,0 +1,17 @@
+"""OpenMetrics export of the instrumentation hooks"""
+
+from cudy_router.instrumentation import MetricsCollector
+
+
+def test_large_counters_are_exported_exactly():
+    collector = MetricsCollector()
+    collector.request("router", "GET", "admin/network/devices/devlist?detail=1", 200, 1234567, 0.1)
+    collector.request("router", "GET", "admin/network/devices/devlist", 200, 1, 0.1)
+    collector.count("retries", "router")
+
+    lines = collector.openmetrics().splitlines()
+
+    assert 'cudy_router_http_response_bytes_total{router="router"} 1234568' in lines
+    assert 'cudy_router_retries_total{router="router"} 1' in lines
+    assert 'cudy_router_http_request_duration_seconds_sum{router="router",method="GET",' \
+        'endpoint="admin/network/devices/devlist",status="200"} 0.2' in lines
@@ -0,0 +1,31 @@
+"""Modem status read through the blocking router"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cudy_router.modem_manager import ModemManager
+from cudy_router.router import CudyRouter
+
+from emulated import serve_in_thread
+
+
+def test_slow_router_does_not_hold_up_the_modem_reads_of_another():
+    with serve_in_thread(2) as server:
+        server.routers[0].latency = 0.5
+        slow, fast = (CudyRouter("127.0.0.1", "admin", "admin", port, cache_policies={}) for port in server.ports)
+        try:
+            assert fast.authenticate() and slow.authenticate()
+            with ThreadPoolExecutor(8) as callers:
+                # Every fetch thread of the slow router busy on its detail page
+                pending = [callers.submit(ModemManager(slow).get_modem_info) for _ in range(8)]
+                time.sleep(0.1)
+                start = time.perf_counter()
+                modem_info = ModemManager(fast).get_modem_info()
+                elapsed = time.perf_counter() - start
+                assert all(future.result().rssi is not None for future in pending)
+        finally:
+            slow.close()
+            fast.close()
+
+    assert modem_info.rssi is not None
+    assert elapsed < 0.4
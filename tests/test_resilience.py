@@ -0,0 +1,199 @@
+"""Retries with backoff, circuit breaking and the typed errors of the fleet"""
+
+import asyncio
+import socket
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from cudy_router import resilience
+from cudy_router.async_router import AsyncCudyRouter
+from cudy_router.emulator import get_emulator_server
+from cudy_router.exceptions import CircuitOpenError, RouterHTTPError
+from cudy_router.fleet import FleetPoller
+from cudy_router.resilience import CircuitBreaker, RequestPolicy
+from cudy_router.router import CudyRouter
+
+from emulated import serve_in_thread
+
+STATUS = "admin/network/gcom/status"
+FAST_RETRIES = RequestPolicy(attempts=10, backoff=timedelta(milliseconds=1), max_backoff=timedelta(milliseconds=5))
+
+
+def test_delay_is_a_random_share_of_an_exponential_ceiling():
+    policy = RequestPolicy(backoff=timedelta(seconds=1), max_backoff=timedelta(seconds=4))
+
+    for attempt, ceiling in ((1, 1), (2, 2), (3, 4), (4, 4), (10, 4)):
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_retries_absorb_server_errors_and_dropped_connections():
+    with serve_in_thread(seed=3) as server, CudyRouter(
+        "127.0.0.1", "admin", "admin", server.ports[0], cache_policies={}, policy=FAST_RETRIES
+    ) as router:
+        assert router.authenticate()
+        emulated = server.routers[0]
+        emulated.error_rate = 0.3
+        emulated.drop_rate = 0.2
+
+        assert all(router.get(STATUS) for _ in range(20))
+        assert emulated.stats["errors"] > 0
+        assert router.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retries_stop_after_the_attempts_of_the_policy():
+    policy = RequestPolicy(attempts=3, backoff=timedelta(milliseconds=1))
+    with serve_in_thread() as server, CudyRouter(
+        "127.0.0.1", "admin", "admin", server.ports[0], cache_policies={}, policy=policy
+    ) as router:
+        assert router.authenticate()
+        emulated = server.routers[0]
+        before = emulated.stats["requests"]
+
+        # Client errors are not retried and say nothing against the router
+        with pytest.raises(RouterHTTPError) as error:
+            router.get("admin/unknown")
+        assert error.value.status == 404
+        assert emulated.stats["requests"] - before == 1
+        assert router.breaker.failures == 0
+
+        emulated.error_rate = 1.0
+        with pytest.raises(RouterHTTPError) as error:
+            router.get(STATUS)
+        assert error.value.status == 500
+        assert emulated.stats["requests"] - before == 1 + 3
+        assert router.breaker.failures == 1
+
+
+def test_breaker_opens_then_lets_a_single_trial_through(monkeypatch):
+    clock = SimpleNamespace(monotonic=lambda: 0.0)
+    monkeypatch.setattr(resilience, "time", clock)
+    breaker = CircuitBreaker(failure_threshold=2, retry_interval=timedelta(seconds=10))
+
+    breaker.before_call("router")
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call("router")
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("router")
+
+    clock.monotonic = lambda: 10.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call("router")
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("router")
+    # A failed trial opens the circuit for another interval
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.monotonic = lambda: 20.0
+    breaker.before_call("router")
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_abandoned_trial_is_due_again(monkeypatch):
+    clock = SimpleNamespace(monotonic=lambda: 0.0)
+    monkeypatch.setattr(resilience, "time", clock)
+    breaker = CircuitBreaker(failure_threshold=1, retry_interval=timedelta(seconds=10))
+    breaker.record_failure()
+
+    clock.monotonic = lambda: 10.0
+    breaker.before_call("router")
+    breaker.release()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call("router")
+
+
+def test_release_leaves_a_closed_circuit_alone():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    breaker.before_call("router")
+    breaker.release()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_failing_router_is_not_queried_until_the_retry_interval():
+    policy = RequestPolicy(attempts=1, failure_threshold=2, retry_interval=timedelta(seconds=0.2))
+
+    async def scenario():
+        async with get_emulator_server() as server:
+            async with AsyncCudyRouter(
+                "127.0.0.1", "admin", "admin", server.ports[0], cache_policies={}, policy=policy
+            ) as router:
+                assert await router.authenticate()
+                emulated = server.routers[0]
+                emulated.error_rate = 1.0
+                for _ in range(2):
+                    with pytest.raises(RouterHTTPError):
+                        await router.get(STATUS)
+                before = emulated.stats["requests"]
+                with pytest.raises(CircuitOpenError):
+                    await router.get(STATUS)
+                skipped = emulated.stats["requests"] == before
+
+                await asyncio.sleep(0.25)
+                emulated.error_rate = 0.0
+                page = await router.get(STATUS)
+                return skipped, page, router.breaker.state
+
+    skipped, page, state = asyncio.run(scenario())
+
+    assert skipped
+    assert page
+    assert state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_request_is_not_a_failure():
+    policy = RequestPolicy(failure_threshold=1)
+
+    async def scenario():
+        async with get_emulator_server(latency=0.3) as server:
+            async with AsyncCudyRouter(
+                "127.0.0.1", "admin", "admin", server.ports[0], cache_policies={}, policy=policy
+            ) as router:
+                assert await router.authenticate()
+                request = asyncio.ensure_future(router.get(STATUS))
+                await asyncio.sleep(0.05)
+                request.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await request
+                return router.breaker
+
+    breaker = asyncio.run(scenario())
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_fleet_reports_the_typed_error_of_a_router_down():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        closed_port = sock.getsockname()[1]
+
+    async def scenario():
+        async with get_emulator_server() as server:
+            entries = [
+                {"name": "down", "host": "127.0.0.1", "port": closed_port, "username": "admin", "password": "admin"},
+                {"name": "denied", "host": "127.0.0.1", "port": server.ports[0], "username": "admin", "password": "wrong"},
+            ]
+            policy = RequestPolicy(attempts=1)
+            async with FleetPoller(entries, policy=policy) as poller:
+                return {result.router: result.errors async for result in poller.poll_once()}
+
+    errors = asyncio.run(scenario())
+
+    # The first collector fails and the others are not tried
+    assert list(errors["down"]) == ["modem"]
+    assert errors["down"]["modem"].startswith("RouterConnectionError: ")
+    assert list(errors["denied"]) == ["modem"]
+    assert errors["denied"]["modem"].startswith("AuthenticationError: ")
@@ -0,0 +1,96 @@
+"""Login sessions: renewed before the router drops them, shared by concurrent callers"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from cudy_router.async_router import AsyncCudyRouter
+from cudy_router.emulator import get_emulator_server
+from cudy_router.router import CudyRouter
+
+from emulated import serve_in_thread
+
+STATUS = "admin/network/gcom/status"
+
+
+def test_session_is_renewed_before_the_router_expires_it():
+    with serve_in_thread(session_timeout=timedelta(seconds=1)) as server, CudyRouter(
+        "127.0.0.1", "admin", "admin", server.ports[0], cache_policies={},
+        session_timeout=timedelta(seconds=1), session_margin=timedelta(seconds=0.5),
+    ) as router:
+        stats = server.routers[0].stats
+        assert router.get(STATUS)
+        first_session = router.auth_cookie
+
+        time.sleep(0.6)
+        assert router.get(STATUS)
+
+        assert router.auth_cookie != first_session
+        assert stats["logins"] == 2
+        # Renewed ahead of time: no request was refused for an expired session
+        assert stats["expired"] == 0
+
+
+def test_session_still_in_its_margin_is_kept():
+    with serve_in_thread(session_timeout=timedelta(seconds=1)) as server, CudyRouter(
+        "127.0.0.1", "admin", "admin", server.ports[0], cache_policies={},
+        session_timeout=timedelta(seconds=1), session_margin=timedelta(seconds=0.5),
+    ) as router:
+        for _ in range(3):
+            assert router.get(STATUS)
+            time.sleep(0.2)
+
+        assert server.routers[0].stats["logins"] == 1
+
+
+def test_concurrent_callers_share_a_single_login():
+    with serve_in_thread(latency=0.1) as server, CudyRouter(
+        "127.0.0.1", "admin", "admin", server.ports[0], cache_policies={}
+    ) as router:
+        emulated = server.routers[0]
+        with ThreadPoolExecutor(8) as pool:
+            assert all(pool.map(lambda _: router.get(STATUS), range(8)))
+        assert emulated.stats["logins"] == 1
+
+        # Refused all at once, the callers log in again only once
+        emulated.expire_sessions()
+        with ThreadPoolExecutor(8) as pool:
+            assert all(pool.map(lambda _: router.get(STATUS), range(8)))
+        assert emulated.stats["logins"] == 2
+
+
+def test_async_concurrent_callers_share_a_single_login():
+    async def scenario():
+        async with get_emulator_server(latency=0.1) as server:
+            async with AsyncCudyRouter("127.0.0.1", "admin", "admin", server.ports[0], cache_policies={}) as router:
+                emulated = server.routers[0]
+                pages = await asyncio.gather(*(router.get(STATUS) for _ in range(8)))
+                logins = [emulated.stats["logins"]]
+                emulated.expire_sessions()
+                pages += await asyncio.gather(*(router.get(STATUS) for _ in range(8)))
+                logins.append(emulated.stats["logins"])
+                return pages, logins
+
+    pages, logins = asyncio.run(scenario())
+
+    assert all(pages)
+    assert logins == [1, 2]
+
+
+def test_async_session_is_renewed_before_the_router_expires_it():
+    async def scenario():
+        async with get_emulator_server(session_timeout=timedelta(seconds=1)) as server:
+            async with AsyncCudyRouter(
+                "127.0.0.1", "admin", "admin", server.ports[0], cache_policies={},
+                session_timeout=timedelta(seconds=1), session_margin=timedelta(seconds=0.5),
+            ) as router:
+                await router.get(STATUS)
+                await asyncio.sleep(0.6)
+                await router.get(STATUS)
+                return server.routers[0].stats
+
+    stats = asyncio.run(scenario())
+
+    assert stats["logins"] == 2
+    assert stats["expired"] == 0